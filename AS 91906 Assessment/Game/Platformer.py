@@ -1,8 +1,23 @@
 ''' Platformer Game '''
 
+# Import standard python libraries
+import argparse
+import glob
+
 # Import arcade python library
 import arcade
 
+# Import the game's level loader and chunked layer renderer
+import animation
+import atlas
+import chunks
+import hud
+import levels
+import profiler
+import replay
+import tile_grid
+import tile_physics
+
 # Constant variables relevant to window display
 SCREEN_WIDTH = 1366
 SCREEN_HEIGHT = 768
@@ -37,10 +52,50 @@ CHARACTER_LIST = {
     3: 'robot/robot'
 }
 
+# Animation states of the player characters:
+# state -> (texture file suffixes, seconds each frame is shown, whether mirrored when facing left)
+CHARACTER_ANIMATIONS = {
+    'idle': (['idle'], None, True),
+    'jump': (['jump'], None, True),
+    'fall': (['fall'], None, True),
+    'walk': (['walk{}'.format(i) for i in range(8)], 1 / 60, True),
+    'climb': (['climb0', 'climb1'], 4 / 60, False)
+}
+
+# Files of every tile image, packed into the atlas cache with the characters' textures
+TILESET_FILES = 'tileset/*.png'
+
 # Constant variables for the game's grid system
 SPRITE_PIXEL_SIZE = 128
 GRID_PIXEL_SIZE = (SPRITE_PIXEL_SIZE * TILE_SCALING)
 
+# Width and height in tiles of each chunk of the tile layers
+CHUNK_TILES = 8
+
+# Draw the tile layers as chunks culled to the screen, instead of whole sprite lists
+CHUNKED_DRAWING = True
+
+# Distance beyond the edges of the screen that tiles are still drawn, in pixels
+CULLING_MARGIN = 2 * GRID_PIXEL_SIZE
+
+# Physics engine to use: 'grid' to collide against the tile grids, or 'arcade'
+PHYSICS_ENGINE = 'grid'
+
+# Physics steps per second that the movement speeds and gravity above are tuned for
+TUNED_PHYSICS_RATE = 60
+
+# Physics steps per second, independent of how often frames are drawn
+PHYSICS_RATE = 60
+
+# Frames drawn per second
+FRAME_RATE = 60
+
+# Most physics steps run for one frame, so a slow frame can't snowball into slower ones
+MAX_PHYSICS_STEPS = 8
+
+# Frames between each refresh of the profiling overlay
+PROFILE_OVERLAY_FRAMES = 30
+
 # Total number of levels in the game
 TOTAL_LEVELS = 3
 
@@ -56,12 +111,101 @@ SCORE_SCALE = -350
 # 'b' value of Desmos equation (see documentation)
 SCORE_SHIFT = 15
 
+# Process-wide registry of textures, keyed by file name and whether they are mirrored
+texture_registry = {}
+
+# Process-wide registry of each level's character textures
+character_registry = {}
+
+
+def get_texture(filename, mirrored=False):
+    ''' Returns a texture from the shared registry, loading it the first time it is needed '''
+    key = (filename, mirrored)
+    texture = texture_registry.get(key)
+    if texture is None:
+        # Take the image from the atlas cache, if it is loaded, instead of decoding its file
+        atlas.register(filename)
+        texture = arcade.load_texture(filename, flipped_horizontally=mirrored)
+        texture_registry[key] = texture
+    return texture
+
+
+def atlas_sources():
+    ''' Returns the file names of every image packed into the atlas cache '''
+    sources = sorted(glob.glob(TILESET_FILES))
+    for character in CHARACTER_LIST.values():
+        for suffixes, frame_time, mirrored in CHARACTER_ANIMATIONS.values():
+            sources += [':resources:images/animated_characters/{}_{}.png'.format(character, suffix)
+                        for suffix in suffixes]
+    return sources
+
+
+class TexturePair:
+    ''' A texture and its mirror image, indexed by the direction the character faces '''
+
+    def __init__(self, filename):
+        ''' Run when a texture pair is created '''
+        # File the original texture is loaded from
+        self.filename = filename
+
+        # Load the original now, as every character spawns facing to the right
+        self.original = get_texture(filename)
+
+    def __getitem__(self, direction):
+        ''' Returns the texture facing a direction, mirroring the original when first needed '''
+        if direction == RIGHT_FACING:
+            return self.original
+        return get_texture(self.filename, mirrored=True)
+
+
 def load_texture_pair(filename):
-    ''' Load a pair of textures, mirroring the original '''
-    return [
-        arcade.load_texture(filename),
-        arcade.load_texture(filename, flipped_horizontally=True)
-    ]
+    ''' Load a pair of textures, mirroring the original only when it is first used '''
+    return TexturePair(filename)
+
+
+class CharacterTextures:
+    ''' One character's textures, loaded once and shared by every PlayerCharacter '''
+
+    def __init__(self, level):
+        ''' Run when a character's textures are first needed '''
+        # Main path of arcade's character resources
+        main_path = ':resources:images/animated_characters/{}'.format(CHARACTER_LIST[level])
+
+        # Build the frame table of each animation state, shared by every sprite of the character
+        self.animations = {}
+        for state, (suffixes, frame_time, mirrored) in CHARACTER_ANIMATIONS.items():
+            frames = [load_texture_pair('{}_{}.png'.format(main_path, suffix)) for suffix in suffixes]
+            self.animations[state] = animation.Animation(frames, frame_time, mirrored)
+
+        # The character's textures for jumping, falling, standing and walking
+        self.idle_texture_pair = self.animations['idle'].frames[0]
+        self.jump_texture_pair = self.animations['jump'].frames[0]
+        self.fall_texture_pair = self.animations['fall'].frames[0]
+        self.walk_textures = self.animations['walk'].frames
+
+        # The character's climbing textures, which are never mirrored
+        self.climbing_textures = self.animations['climb'].table(RIGHT_FACING)
+
+    def facing(self, direction):
+        ''' Returns every texture used when facing a direction '''
+        pairs = [self.idle_texture_pair, self.jump_texture_pair, self.fall_texture_pair]
+        pairs += self.walk_textures
+        textures = [pair[direction] for pair in pairs]
+
+        # Climbing textures are not mirrored, so they belong with the originals
+        if direction == RIGHT_FACING:
+            textures += self.climbing_textures
+
+        return textures
+
+
+def get_character_textures(level):
+    ''' Returns a level's character textures, loading them only the first time '''
+    textures = character_registry.get(level)
+    if textures is None:
+        textures = CharacterTextures(level)
+        character_registry[level] = textures
+    return textures
 
 
 class PlayerCharacter(arcade.Sprite):
@@ -72,43 +216,48 @@ class PlayerCharacter(arcade.Sprite):
         # Inherit all variables from __init__() of arcade.Sprite
         super().__init__()
 
-        # Spawn character facing to the right
-        self.character_face_direction = RIGHT_FACING
-
-        # Iterative variable to cycle between animated image sequences
-        self.cur_texture = 0
-
         # Scale character as per game constant
         self.scale = CHARACTER_SCALING
 
+        # Use the character's shared textures
+        self.character_textures = get_character_textures(level)
+        self.idle_texture_pair = self.character_textures.idle_texture_pair
+        self.jump_texture_pair = self.character_textures.jump_texture_pair
+        self.fall_texture_pair = self.character_textures.fall_texture_pair
+        self.walk_textures = self.character_textures.walk_textures
+        self.climbing_textures = self.character_textures.climbing_textures
+
+        # Variable to track which directions' textures are in the sprite lists' atlases
+        self.preloaded_directions = set()
+
+        # Put the character in its spawn state
+        self.reset()
+
+    def reset(self):
+        ''' Puts the character back in its spawn state, facing right and standing still, as when a level is started '''
+        # Spawn character facing to the right
+        self.character_face_direction = RIGHT_FACING
+
         # Variables to store character's movement state
         self.jumping = False
         self.climbing = False
         self.is_on_ladder = False
 
-        # Main path of arcade's character resources
-        main_path = ':resources:images/animated_characters/{}'.format(CHARACTER_LIST[level])
+        # Animation being played, using the frame tables shared by every sprite of the character
+        self.animator = animation.Animator(self.character_textures.animations)
 
-        # Load the character's textures for jumping, falling and standing
-        self.idle_texture_pair = load_texture_pair('{}_idle.png'.format(main_path))
-        self.jump_texture_pair = load_texture_pair('{}_jump.png'.format(main_path))
-        self.fall_texture_pair = load_texture_pair('{}_fall.png'.format(main_path))
+        # Set the spawn texture
+        self.texture = self.idle_texture_pair[RIGHT_FACING]
 
-        # Load the character's walking textures and store in a list
-        self.walk_textures = []
-        for i in range(8):
-            texture = load_texture_pair('{}_walk{}.png'.format(main_path,i))
-            self.walk_textures.append(texture)
+    def preload_textures(self, direction):
+        ''' Adds every texture for a direction to the atlas of each sprite list holding the character '''
+        if direction in self.preloaded_directions:
+            return
+        self.preloaded_directions.add(direction)
 
-        # Load the character's climbing textures and store in a list
-        self.climbing_textures = []
-        texture = arcade.load_texture('{}_climb0.png'.format(main_path))
-        self.climbing_textures.append(texture)
-        texture = arcade.load_texture('{}_climb1.png'.format(main_path))
-        self.climbing_textures.append(texture)
-
-        # Set the spawn texture
-        self.texture = self.idle_texture_pair[0]
+        # One atlas rebuild for the whole set, instead of one per new animation frame
+        for sprite_list in self.sprite_lists:
+            sprite_list.preload_textures(self.character_textures.facing(direction))
 
     def update_animation(self, delta_time): #delta_time: Time interval since previous function call in seconds.
         ''' Method to set the animation's graphical state depending on its action '''
@@ -118,37 +267,188 @@ class PlayerCharacter(arcade.Sprite):
         elif self.change_x > 0 and self.character_face_direction == LEFT_FACING:
             self.character_face_direction = RIGHT_FACING
 
-        # Animation for climbing
-        if self.is_on_ladder:
-            self.climbing = True
-        if not self.is_on_ladder and self.climbing:
-            self.climbing = False
-        if self.climbing and abs(self.change_y) > 1: #abs returns the absolute value, i.e. -20 would return 20
-            self.cur_texture += 1
-            if self.cur_texture > 7:
-                self.cur_texture = 0
+        # Mirror the character's textures the first time it faces left
+        if self.character_face_direction == LEFT_FACING:
+            self.preload_textures(LEFT_FACING)
+
+        # Variable to store whether the animation moves on, or holds its current frame
+        playing = True
+
+        # Animation for climbing, which only moves while climbing up or down
+        self.climbing = self.is_on_ladder
         if self.climbing:
-            self.texture = self.climbing_textures[self.cur_texture // 4]
-            return
+            state = 'climb'
+            playing = abs(self.change_y) > 1 #abs returns the absolute value, i.e. -20 would return 20
 
-        # Animation for jumping, and is dependant on whether the sprite is on a ladder or not
-        if self.change_y > 0 and not self.is_on_ladder:
-            self.texture = self.jump_texture_pair[self.character_face_direction]
-            return
-        elif self.change_y < 0 and not self.is_on_ladder:
-            self.texture = self.fall_texture_pair[self.character_face_direction]
-            return
+        # Animation for jumping and falling
+        elif self.change_y > 0:
+            state = 'jump'
+        elif self.change_y < 0:
+            state = 'fall'
 
         # Animation for idling
-        if self.change_x == 0:
-            self.texture = self.idle_texture_pair[self.character_face_direction]
-            return
+        elif self.change_x == 0:
+            state = 'idle'
 
         # Animation for walking
-        self.cur_texture += 1
-        if self.cur_texture > 7:
-            self.cur_texture = 0
-        self.texture = self.walk_textures[self.cur_texture][self.character_face_direction]
+        else:
+            state = 'walk'
+
+        # Only touch the texture when the frame shown actually changes
+        texture = self.animator.update(state, self.character_face_direction, delta_time, playing)
+        if texture is not None:
+            self.texture = texture
+
+
+class LevelSnapshot:
+    ''' A level's starting state, never changed, so the level can be put back the way it started '''
+
+    def __init__(self, gems, spawn):
+        ''' Run when a level is prepared '''
+        # Every gem on the level before any are collected
+        self.gems = frozenset(gems)
+
+        # (x, y) position the player starts and respawns at
+        self.spawn = spawn
+
+
+class PreparedLevel:
+    ''' A level's map data, sprites and player character, ready to be swapped in '''
+
+    def __init__(self, level, level_data=None):
+        ''' Run when a level is prepared, which may be on a worker thread
+
+        The level's map is read from its file unless already decoded map data is given.
+        '''
+        # Name of the layer containing the platforms
+        platforms_layer_name = 'Platforms'
+        # Name of the layer containing collectables
+        gems_layer_name = 'Gems'
+        # Name of the layer containing foreground textures
+        foreground_layer_name = 'Foreground'
+        # Name of the layer containing background textures
+        background_layer_name = 'Background'
+        # Name of the layer containing obstacles
+        obstacles_name = 'Obstacles'
+        # Name of the layer containing ladders
+        ladders_layer_name = 'Ladders'
+
+        # Load the level, decoded once per process and reused on restarts
+        if level_data is None:
+            level_data = levels.read_level(level)
+        self.level_data = level_data
+
+        # Decode the images of the tiles the level uses, all at once, before building its layers
+        levels.load_tile_textures(self.level_data)
+
+        # Create the player sprite, loading its textures, and the list it is drawn from
+        self.player_sprite = PlayerCharacter(level)
+        self.player_list = arcade.SpriteList()
+        self.player_list.append(self.player_sprite)
+
+        # Background layer
+        self.background_list = levels.build_layer(self.level_data,
+                                                  background_layer_name,
+                                                  TILE_SCALING)
+
+        # Foreground layer
+        self.foreground_list = levels.build_layer(self.level_data,
+                                                  foreground_layer_name,
+                                                  TILE_SCALING)
+
+        # Platform layer
+        self.wall_list = levels.build_layer(self.level_data,
+                                            platforms_layer_name,
+                                            TILE_SCALING,
+                                            use_spatial_hash=True)
+
+        # Gem layer
+        self.gem_list = levels.build_layer(self.level_data,
+                                           gems_layer_name,
+                                           TILE_SCALING,
+                                           use_spatial_hash=True)
+
+        # Obstacle layer
+        self.dont_touch_list = levels.build_layer(self.level_data,
+                                                  obstacles_name,
+                                                  TILE_SCALING,
+                                                  use_spatial_hash=True)
+
+        # Ladder layer
+        self.ladder_list = levels.build_layer(self.level_data,
+                                              ladders_layer_name,
+                                              TILE_SCALING,
+                                              use_spatial_hash=True)
+
+        # Split the layers into chunks drawn only when on screen
+        chunk_size = CHUNK_TILES * GRID_PIXEL_SIZE
+        self.background_layer = chunks.ChunkedLayer(self.background_list, chunk_size)
+        self.foreground_layer = chunks.ChunkedLayer(self.foreground_list, chunk_size)
+        self.wall_layer = chunks.ChunkedLayer(self.wall_list, chunk_size)
+        self.ladder_layer = chunks.ChunkedLayer(self.ladder_list, chunk_size)
+        self.dont_touch_layer = chunks.ChunkedLayer(self.dont_touch_list, chunk_size)
+
+        # Gems are removed when collected, so their chunks are not static
+        self.gem_layer = chunks.ChunkedLayer(self.gem_list, chunk_size, is_static=False)
+
+        # Index the layers the player collides with by grid cell
+        self.wall_grid = tile_grid.TileGrid(self.wall_list, GRID_PIXEL_SIZE)
+        self.gem_grid = tile_grid.TileGrid(self.gem_list, GRID_PIXEL_SIZE)
+        self.dont_touch_grid = tile_grid.TileGrid(self.dont_touch_list, GRID_PIXEL_SIZE)
+        self.ladder_grid = tile_grid.TileGrid(self.ladder_list, GRID_PIXEL_SIZE)
+
+        # The level's starting state, and the gems collected since it was last restored
+        self.snapshot = LevelSnapshot(self.gem_list, (PLAYER_START_X, PLAYER_START_Y))
+        self.collected_gems = []
+
+    def collect(self, gem):
+        ''' Removes a collected gem from the level, remembering it so it can be put back '''
+        gem.remove_from_sprite_lists()
+        self.gem_grid.remove(gem)
+        self.collected_gems.append(gem)
+
+    def restore(self):
+        ''' Puts the level back to its snapshot, touching only the gems collected since '''
+        for gem in self.collected_gems:
+            if gem in self.snapshot.gems:
+                self.gem_list.append(gem)
+                self.gem_layer.restore(gem)
+                self.gem_grid.add(gem)
+        self.collected_gems = []
+
+
+# Prepares upcoming levels on a worker thread
+level_preloader = levels.LevelPreloader(PreparedLevel)
+
+# Levels already played, kept so they are restored instead of loaded again
+prepared_levels = {}
+
+
+def get_prepared_level(level):
+    ''' Returns a level ready to be played, reusing it if it has been played before '''
+    prepared = prepared_levels.get(level)
+    if prepared is None:
+        prepared = level_preloader.take(level)
+        prepared_levels[level] = prepared
+    return prepared
+
+
+def calculate_score(gems, minutes, seconds, millis, lives):
+    ''' Calculates the game score from the game results '''
+    # Ensure score does not get multiplied by 0
+    if lives == 0:
+        lives = 0.5
+
+    # Calculate game score using game results
+    total_seconds = float(minutes*60 + seconds + float(millis))
+    score = (((SCORE_SCALE * total_seconds)/(gems + SCORE_SHIFT))
+                + 4*SCORE_SCALE) * lives
+
+    # If score function returns a negative result, use a different formula
+    if score <= 0:
+        score = int((gems * (1/total_seconds) * 1000) * lives)
+
+    return score
 
 
 class GameOverView(arcade.View):
@@ -170,18 +470,23 @@ class GameOverView(arcade.View):
         self.millis = millis
         self.lives = lives
 
-        # Ensure score does not get multiplied by 0
-        if self.lives == 0:
-            self.lives = 0.5
-
         # Calculate game score using game results
-        self.total_seconds = float(self.minutes*60 + self.seconds + float(self.millis))
-        self.score = (((SCORE_SCALE * self.total_seconds)/(self.gems + SCORE_SHIFT))
-                        + 4*SCORE_SCALE) * self.lives
+        self.score = calculate_score(self.gems, self.minutes, self.seconds,
+                                     self.millis, self.lives)
+
+        # Variable to store the game to restart, set by the game that ended
+        self.game_view = None
 
-        # If score function returns a negative result, use a different formula
-        if self.score <= 0:
-            self.score = int((self.gems * (1/self.total_seconds) * 1000) * self.lives)
+        # Render game results text once, to be drawn in the middle of the screen
+        end_text = ('Gems: {} | Time: {:02d}:{:02d}:{} | Score: {}'.format(self.gems,
+                                                                           self.minutes,
+                                                                           self.seconds,
+                                                                           str(self.millis)[-2:],
+                                                                           self.score))
+        self.end_label = hud.TextLabel(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2,
+                                       arcade.csscolor.BLACK, 24, align='center',
+                                       anchor_x='center', anchor_y='center')
+        self.end_label.set_text(end_text)
 
     def on_draw(self):
         ''' Draws the game over screen '''
@@ -191,30 +496,19 @@ class GameOverView(arcade.View):
                                 SCREEN_WIDTH, SCREEN_HEIGHT)
 
         # Draw game results text in the middle of the screen
-        end_text = ('Gems: {} | Time: {:02d}:{:02d}:{} | Score: {}'.format(self.gems,
-                                                                           self.minutes,
-                                                                           self.seconds,
-                                                                           str(self.millis)[-2:],
-                                                                           self.score))
-        arcade.draw_text(end_text, SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2,
-                         arcade.csscolor.BLACK, 24, align='center',
-                         anchor_x='center', anchor_y='center')
+        self.end_label.draw()
      
     def on_mouse_press(self, _x, _y, _button, _modifiers):
-        ''' Restarts the game on mouse click '''
-        game_view = MyGame()
-        game_view.setup(game_view.level)
-        self.window.show_view(game_view)
+        ''' Restarts the game on mouse click, restoring the finished game instead of loading it again '''
+        self.game_view.restart()
+        self.window.show_view(self.game_view)
 
 
-class MyGame(arcade.View):
-    ''' Main application class. '''
+class GameWorld:
+    ''' Game state and logic, independent of any window or GL context '''
 
     def __init__(self):
-        ''' Run when an instance of the game is created '''
-        # Inherit all variables from __init__() of arcade.View
-        super().__init__()
-
+        ''' Run when an instance of the game world is created '''
         # Variables to store key press states
         self.left_pressed = False
         self.right_pressed = False
@@ -223,6 +517,7 @@ class MyGame(arcade.View):
         self.jump_needs_reset = False
 
         # Lists to store all sprites by type
+        self.player_list = None
         self.gem_list = None
         self.wall_list = None
         self.foreground_list = None
@@ -230,16 +525,52 @@ class MyGame(arcade.View):
         self.dont_touch_list = None
         self.ladder_list = None
 
-        # Variable to store player sprite
+        # Chunks of each layer, culled to the screen when drawn
+        self.background_layer = None
+        self.foreground_layer = None
+        self.wall_layer = None
+        self.gem_layer = None
+        self.ladder_layer = None
+        self.dont_touch_layer = None
+
+        # Grid cell indexes of the layers the player collides with
+        self.wall_grid = None
+        self.gem_grid = None
+        self.dont_touch_grid = None
+        self.ladder_grid = None
+
+        # Variables to store player sprite and where it respawns
         self.player_sprite = None
+        self.spawn = (PLAYER_START_X, PLAYER_START_Y)
+
+        # Variable to store the level being played, which collected gems are removed from
+        self.prepared = None
 
-        # Variable to store game physics engine
+        # Variables to store game physics engine and which kind to use
         self.physics_engine = None
+        self.physics_engine_type = PHYSICS_ENGINE
+
+        # Variables to store the fixed physics rate, and frame time not yet simulated
+        self.physics_rate = PHYSICS_RATE
+        self.accumulator = 0.0
+
+        # Movement speeds per physics step, scaled to the physics rate in setup()
+        self.movement_speed = PLAYER_MOVEMENT_SPEED
+        self.jump_speed = PLAYER_JUMP_SPEED
+
+        # Player position and viewport before the last physics step, and how far a frame is
+        # between it and the next step, so frames can be drawn between steps
+        self.previous_position = (PLAYER_START_X, PLAYER_START_Y)
+        self.previous_view = (0, 0)
+        self.interpolation = 1.0
 
         # Variables to store scrolling data
         self.view_bottom = 0
         self.view_left = 0
 
+        # Variable to flag that the viewport has moved since the last update
+        self.viewport_changed = False
+
         # Variables to track game results
         self.gems = 0
         self.minutes = 0
@@ -256,104 +587,108 @@ class MyGame(arcade.View):
         # Variable to store the x-coord for the end of the map
         self.end_of_map = 0
 
-    def setup(self, level):
-        ''' Sets up game to load new levels '''
-        # Initialise sprite lists as objects of arcade.SpriteList
-        self.player_list = arcade.SpriteList()
-        self.wall_list = arcade.SpriteList()
-        self.gem_list = arcade.SpriteList()
-        self.dont_touch_list = arcade.SpriteList()
-        self.ladder_list = arcade.SpriteList()
-        self.foreground_list = arcade.SpriteList()
-        self.background_list = arcade.SpriteList()
-
-        # Set up the player sprite and store in a list
-        self.player_sprite = PlayerCharacter(level)
-        self.player_sprite.center_x = PLAYER_START_X
-        self.player_sprite.center_y = PLAYER_START_Y
-        self.player_list.append(self.player_sprite)
-
-        # Name of the layer containing the platforms
-        platforms_layer_name = 'Platforms'
-        # Name of the layer containing collectables
-        gems_layer_name = 'Gems'
-        # Name of the layer containing foreground textures
-        foreground_layer_name = 'Foreground'
-        # Name of the layer containing background textures
-        background_layer_name = 'Background'
-        # Name of the layer containing obstacles
-        obstacles_name = 'Obstacles'
-        # Name of the layer containing ladders
-        ladders_layer_name = 'Ladders'
-
-        # File directory of maps
-        map_name = ('levels/map1_level_{}.tmx'.format(level))
-
-        # Load the map
-        my_map = arcade.tilemap.read_tmx(map_name)
+        # Variable to store the map's background colour
+        self.background_color = None
+
+        # Variable to store the profiler timing each part of an update
+        self.profiler = profiler.NULL_PROFILER
+
+    def setup(self, level, prepared=None):
+        ''' Sets up game to load new levels, or an already prepared level if one is given '''
+        # Take the level's sprites, prepared in the background if the level was preloaded,
+        # and put back any gems collected the last time it was played
+        if prepared is None:
+            prepared = get_prepared_level(level)
+        prepared.restore()
+        self.prepared = prepared
+
+        # Set up the player sprite at the level's spawn, standing still, facing right and
+        # not part way through any animation from the last time the level was played
+        self.player_list = prepared.player_list
+        self.player_sprite = prepared.player_sprite
+        self.spawn = prepared.snapshot.spawn
+        self.player_sprite.center_x, self.player_sprite.center_y = self.spawn
+        self.player_sprite.change_x = 0
+        self.player_sprite.change_y = 0
+        self.player_sprite.reset()
+        self.player_sprite.preload_textures(RIGHT_FACING)
 
         # Calculate the map exit point
-        self.end_of_map = (my_map.map_size.width - MAP_END_OFFSET) * GRID_PIXEL_SIZE
+        self.end_of_map = (prepared.level_data.width - MAP_END_OFFSET) * GRID_PIXEL_SIZE
+
+        # Swap in the map's layers
+        self.background_list = prepared.background_list
+        self.foreground_list = prepared.foreground_list
+        self.wall_list = prepared.wall_list
+        self.gem_list = prepared.gem_list
+        self.dont_touch_list = prepared.dont_touch_list
+        self.ladder_list = prepared.ladder_list
+        self.background_layer = prepared.background_layer
+        self.foreground_layer = prepared.foreground_layer
+        self.wall_layer = prepared.wall_layer
+        self.gem_layer = prepared.gem_layer
+        self.ladder_layer = prepared.ladder_layer
+        self.dont_touch_layer = prepared.dont_touch_layer
+        self.wall_grid = prepared.wall_grid
+        self.gem_grid = prepared.gem_grid
+        self.dont_touch_grid = prepared.dont_touch_grid
+        self.ladder_grid = prepared.ladder_grid
+
+        # Store the map's background colour, as setting it requires a window
+        self.background_color = prepared.level_data.background_color
+
+        # Scale speeds by the step length, and gravity by its square, so movement matches the tuned rate
+        step_scale = TUNED_PHYSICS_RATE / self.physics_rate
+        self.movement_speed = PLAYER_MOVEMENT_SPEED * step_scale
+        self.jump_speed = PLAYER_JUMP_SPEED * step_scale
+        gravity = GRAVITY * step_scale ** 2
 
-        # Background layer
-        self.background_list = arcade.tilemap.process_layer(my_map,
-                                                            background_layer_name,
-                                                            TILE_SCALING)
-
-        # Foreground layer
-        self.foreground_list = arcade.tilemap.process_layer(my_map,
-                                                            foreground_layer_name,
-                                                            TILE_SCALING)
-
-        # Platform layer
-        self.wall_list = arcade.tilemap.process_layer(map_object=my_map,
-                                                      layer_name=platforms_layer_name,
-                                                      scaling=TILE_SCALING,
-                                                      use_spatial_hash=True)
-
-        # Gem layer
-        self.gem_list = arcade.tilemap.process_layer(my_map,
-                                                      gems_layer_name,
-                                                      TILE_SCALING,
-                                                      use_spatial_hash=True)
+        # Set the 'physics engine'
+        if self.physics_engine_type == 'grid':
+            self.physics_engine = tile_physics.TilePhysicsEngine(self.player_sprite,
+                                                                 self.wall_grid,
+                                                                 gravity,
+                                                                 ladders=self.ladder_grid)
+        else:
+            self.physics_engine = arcade.PhysicsEnginePlatformer(self.player_sprite,
+                                                                 self.wall_list, 
+                                                                 gravity, 
+                                                                 ladders=self.ladder_list)
 
-        # Obstacle layer
-        self.dont_touch_list = arcade.tilemap.process_layer(my_map,
-                                                            obstacles_name,
-                                                            TILE_SCALING,
-                                                            use_spatial_hash=True)
+        # Don't draw the player sliding from where it was on the last level
+        self.reset_interpolation()
 
-        # Ladder layer
-        self.ladder_list = arcade.tilemap.process_layer(my_map,
-                                                        ladders_layer_name,
-                                                        TILE_SCALING,
-                                                        use_spatial_hash=True)
+        # Start preparing the next level while this one is played, unless it already has been
+        if level < TOTAL_LEVELS and level + 1 not in prepared_levels:
+            level_preloader.preload(level + 1)
 
-        # Set the map's background colour
-        if my_map.background_color:
-            arcade.set_background_color(my_map.background_color)
+    def restart(self):
+        ''' Puts the game back to the start of the first level, without loading any level again '''
+        # Release every key, and drop any frame time not yet simulated
+        self.left_pressed = False
+        self.right_pressed = False
+        self.up_pressed = False
+        self.down_pressed = False
+        self.jump_needs_reset = False
+        self.accumulator = 0.0
 
-        # Set the 'physics engine'
-        self.physics_engine = arcade.PhysicsEnginePlatformer(self.player_sprite,
-                                                             self.wall_list, 
-                                                             GRAVITY, 
-                                                             ladders=self.ladder_list)
+        # Reset the game results
+        self.gems = 0
+        self.total_time = 0.00
+        self.update_clock()
+        self.lives = MAX_LIVES
 
-    def on_draw(self):
-        ''' Render the screen. '''
-        # Clear the screen
-        arcade.start_render()
+        # Move the viewport back to the start
+        self.view_left = 0
+        self.view_bottom = 0
+        self.viewport_changed = True
 
-        # Draw the map's sprites
-        self.wall_list.draw()
-        self.background_list.draw()
-        self.wall_list.draw()
-        self.gem_list.draw()
-        self.ladder_list.draw()
-        self.dont_touch_list.draw()
-        self.player_list.draw()
-        self.foreground_list.draw()
+        # Restore the first level, which restores its gems
+        self.level = 1
+        self.setup(self.level)
 
+    def update_clock(self):
+        ''' Splits the total time elapsed into minutes, seconds and milliseconds '''
         # Calculate the minutes elapsed
         self.minutes = int(self.total_time) // 60
 
@@ -363,28 +698,19 @@ class MyGame(arcade.View):
         # Calculate the milliseconds elapsed
         self.millis = format(round(float(self.total_time) - int(self.total_time), 2), '.2f')
 
-        # Draw game stats on the screen
-        game_text = ('Gems: {} | Lives: {} | Time: {:02d}:{:02d}'.format(self.gems,
-                                                                         self.lives,
-                                                                         self.minutes,
-                                                                         self.seconds))
-        arcade.draw_text(game_text, 10 + self.view_left,
-                         10 + self.view_bottom,
-                        arcade.csscolor.WHITE, 24)
-
     def process_keychange(self):
         ''' Called when we change a key up/down or we move on/off a ladder. '''
         # Process up/down inputs
         if self.up_pressed and not self.down_pressed:
             if self.physics_engine.is_on_ladder():
-                self.player_sprite.change_y = PLAYER_MOVEMENT_SPEED
+                self.player_sprite.change_y = self.movement_speed
             elif self.physics_engine.can_jump() and not self.jump_needs_reset:
-                self.player_sprite.change_y = PLAYER_JUMP_SPEED
+                self.player_sprite.change_y = self.jump_speed
                 self.jump_needs_reset = True
                 
         elif self.down_pressed and not self.up_pressed:
             if self.physics_engine.is_on_ladder():
-                self.player_sprite.change_y = -PLAYER_MOVEMENT_SPEED
+                self.player_sprite.change_y = -self.movement_speed
 
         # Process up/down when on a ladder and no movement
         if self.physics_engine.is_on_ladder():
@@ -395,13 +721,13 @@ class MyGame(arcade.View):
 
         # Process left/right inputs
         if self.right_pressed and not self.left_pressed:
-            self.player_sprite.change_x = PLAYER_MOVEMENT_SPEED
+            self.player_sprite.change_x = self.movement_speed
         elif self.left_pressed and not self.right_pressed:
-            self.player_sprite.change_x = -PLAYER_MOVEMENT_SPEED
+            self.player_sprite.change_x = -self.movement_speed
         else:
             self.player_sprite.change_x = 0
 
-    def on_key_press(self, key, modifiers):
+    def key_press(self, key):
         ''' Called whenever a key is pressed. '''
         if key == arcade.key.UP or key == arcade.key.W:
             self.up_pressed = True
@@ -414,7 +740,7 @@ class MyGame(arcade.View):
 
         self.process_keychange()
 
-    def on_key_release(self, key, modifiers):
+    def key_release(self, key):
         ''' Called when the user releases a key. '''
         if key == arcade.key.UP or key == arcade.key.W:
             self.up_pressed = False
@@ -428,83 +754,92 @@ class MyGame(arcade.View):
 
         self.process_keychange()
 
-    def on_update(self, delta_time):
-        ''' Movement and game logic '''
+    def update(self, delta_time):
+        ''' One physics step of movement and game logic, returning the end screen to display if the game is over '''
+        # Variable to store which end screen to display, if any
+        outcome = None
+
+        # Freeze the clock at the time last shown to the player
+        self.update_clock()
+
         # Move the player using the physics engine
-        self.physics_engine.update()
+        with self.profiler.section('physics'):
+            self.physics_engine.update()
 
-        # Update the animations
-        if self.physics_engine.can_jump():
-            self.player_sprite.can_jump = False
-        else:
-            self.player_sprite.can_jump = True
+            if self.physics_engine.can_jump():
+                self.player_sprite.can_jump = False
+            else:
+                self.player_sprite.can_jump = True
 
-        if self.physics_engine.is_on_ladder() and not self.physics_engine.can_jump():
-            self.player_sprite.is_on_ladder = True
-            self.process_keychange()
-        else:
-            self.player_sprite.is_on_ladder = False
-            self.process_keychange()
+            if self.physics_engine.is_on_ladder() and not self.physics_engine.can_jump():
+                self.player_sprite.is_on_ladder = True
+                self.process_keychange()
+            else:
+                self.player_sprite.is_on_ladder = False
+                self.process_keychange()
 
-        self.player_list.update_animation(delta_time)
+        with self.profiler.section('gem collision'):
+            # Check for collisions with gems
+            gem_hit_list = self.gem_grid.collisions(self.player_sprite)
 
-        # Check for collisions with gems
-        gem_hit_list = arcade.check_for_collision_with_list(self.player_sprite, self.gem_list)
-        
-        # Remove collected gems from the map
-        for gem in gem_hit_list:
-            # Remove the gem
-            gem.remove_from_sprite_lists()
-            # Add to the count of gems collected
-            self.gems += 1
+            # Remove collected gems from the map
+            for gem in gem_hit_list:
+                # Remove the gem, remembering it so a restart can put it back
+                self.prepared.collect(gem)
+                # Add to the count of gems collected
+                self.gems += 1
+
+        # Check for collisions with obstacles
+        with self.profiler.section('obstacle collision'):
+            hit_obstacle = bool(self.dont_touch_grid.collisions(self.player_sprite))
 
         # --- Manage Scrolling ---
-        # Check if viewport needs to change
-        changed = False
-        if arcade.check_for_collision_with_list(self.player_sprite,
-                                                self.dont_touch_list):
-            self.lives -= 1
-            
-            self.player_sprite.change_x = 0
-            self.player_sprite.change_y = 0
-            self.player_sprite.center_x = PLAYER_START_X
-            self.player_sprite.center_y = PLAYER_START_Y
+        with self.profiler.section('scrolling'):
+            # Check if viewport needs to change
+            changed = False
+            if hit_obstacle:
+                self.lives -= 1
 
-            self.view_left = 0
-            self.view_bottom = 0
-            changed = True
-
-        # Scroll left
-        left_boundary = self.view_left + LEFT_VIEWPORT_MARGIN
-        if self.player_sprite.left < left_boundary:
-            self.view_left -= left_boundary - self.player_sprite.left
-            changed = True
-
-        # Scroll right
-        right_boundary = self.view_left + SCREEN_WIDTH - RIGHT_VIEWPORT_MARGIN
-        if self.player_sprite.right > right_boundary:
-            self.view_left += self.player_sprite.right - right_boundary
-            changed = True
-
-        # Scroll up
-        top_boundary = self.view_bottom + SCREEN_HEIGHT - TOP_VIEWPORT_MARGIN
-        if self.player_sprite.top > top_boundary:
-            self.view_bottom += self.player_sprite.top - top_boundary
-            changed = True
-
-        # Scroll down
-        bottom_boundary = self.view_bottom + BOTTOM_VIEWPORT_MARGIN
-        if self.player_sprite.bottom < bottom_boundary:
-            self.view_bottom -= bottom_boundary - self.player_sprite.bottom
-            changed = True
-
-        if changed:
-            # Only scroll to full integer values
-            self.view_bottom = int(self.view_bottom)
-            self.view_left = int(self.view_left)
-            # Scroll the viewport
-            arcade.set_viewport(self.view_left, SCREEN_WIDTH + self.view_left,
-                                self.view_bottom, SCREEN_HEIGHT + self.view_bottom)
+                self.player_sprite.change_x = 0
+                self.player_sprite.change_y = 0
+                self.player_sprite.center_x, self.player_sprite.center_y = self.spawn
+
+                self.view_left = 0
+                self.view_bottom = 0
+                changed = True
+
+                # Don't draw the player sliding back to the start
+                self.reset_interpolation()
+
+            # Scroll left
+            left_boundary = self.view_left + LEFT_VIEWPORT_MARGIN
+            if self.player_sprite.left < left_boundary:
+                self.view_left -= left_boundary - self.player_sprite.left
+                changed = True
+
+            # Scroll right
+            right_boundary = self.view_left + SCREEN_WIDTH - RIGHT_VIEWPORT_MARGIN
+            if self.player_sprite.right > right_boundary:
+                self.view_left += self.player_sprite.right - right_boundary
+                changed = True
+
+            # Scroll up
+            top_boundary = self.view_bottom + SCREEN_HEIGHT - TOP_VIEWPORT_MARGIN
+            if self.player_sprite.top > top_boundary:
+                self.view_bottom += self.player_sprite.top - top_boundary
+                changed = True
+
+            # Scroll down
+            bottom_boundary = self.view_bottom + BOTTOM_VIEWPORT_MARGIN
+            if self.player_sprite.bottom < bottom_boundary:
+                self.view_bottom -= bottom_boundary - self.player_sprite.bottom
+                changed = True
+
+            if changed:
+                # Only scroll to full integer values
+                self.view_bottom = int(self.view_bottom)
+                self.view_left = int(self.view_left)
+            self.viewport_changed = changed
         
         if self.player_sprite.center_x >= self.end_of_map:
             # Advance to the next level
@@ -512,41 +847,327 @@ class MyGame(arcade.View):
             # Move viewport back to the start
             self.view_left = 0
             self.view_bottom = 0
-            arcade.set_viewport(self.view_left, SCREEN_WIDTH + self.view_left,
-                                self.view_bottom, SCREEN_HEIGHT + self.view_bottom)
+            self.viewport_changed = True
 
             if self.level <= TOTAL_LEVELS:
                 # Load the next level
                 self.setup(self.level)
 
             else:
-                # Draw the game over screen
-                view = GameOverView('game_over', self.gems, self.minutes,
-                                    self.seconds, self.millis, self.lives)
-                self.window.show_view(view)
+                # Show the game over screen
+                outcome = 'game_over'
 
         if self.lives == 0:
-                # Draw the death screen
-                view = GameOverView('death', self.gems, self.minutes,
-                                    self.seconds, self.millis, self.lives)
-                self.window.show_view(view)
+                # Show the death screen
+                outcome = 'death'
 
         # Update total time
         self.total_time += delta_time
 
+        return outcome
+
+    def advance(self, delta_time):
+        ''' Runs as many fixed physics steps as fit in a frame's time, returning the end screen to display if the game is over '''
+        # Length of one physics step, in seconds
+        step_time = 1 / self.physics_rate
+
+        # Variables to store the end screen, and whether any step moved the viewport
+        outcome = None
+        viewport_changed = False
+
+        # Step the physics until less than a step of the frame's time is left over
+        self.accumulator += delta_time
+        steps = 0
+        while self.accumulator >= step_time and not outcome:
+            # Drop the time of any steps beyond the limit, slowing the game instead of stalling it
+            if steps == MAX_PHYSICS_STEPS:
+                self.accumulator %= step_time
+                break
+
+            self.previous_position = self.player_sprite.position
+            self.previous_view = (self.view_left, self.view_bottom)
+            outcome = self.update(step_time)
+            viewport_changed = viewport_changed or self.viewport_changed
+            self.accumulator -= step_time
+            steps += 1
+
+        self.viewport_changed = viewport_changed
+
+        # How far the frame is between the last step and the next
+        self.interpolation = self.accumulator / step_time
+
+        # Update the animations once per frame
+        with self.profiler.section('animation'):
+            self.player_list.update_animation(delta_time)
+
+        return outcome
+
+    def reset_interpolation(self):
+        ''' Draws the player and viewport where they are now, instead of between steps '''
+        self.previous_position = self.player_sprite.position
+        self.previous_view = (self.view_left, self.view_bottom)
+
+    def interpolated(self):
+        ''' Returns the player position and viewport to draw, between the last two physics steps '''
+        fraction = self.interpolation
+        previous_x, previous_y = self.previous_position
+        previous_left, previous_bottom = self.previous_view
+
+        x = previous_x + (self.player_sprite.center_x - previous_x) * fraction
+        y = previous_y + (self.player_sprite.center_y - previous_y) * fraction
+        # Only scroll to full integer values
+        view_left = int(previous_left + (self.view_left - previous_left) * fraction)
+        view_bottom = int(previous_bottom + (self.view_bottom - previous_bottom) * fraction)
+
+        return x, y, view_left, view_bottom
+
+    def summary(self, outcome=None):
+        ''' Returns the game results, as shown on the end screen, and where the player ended up '''
+        return {'outcome': outcome,
+                'level': self.level,
+                'gems': self.gems,
+                'lives': self.lives,
+                'minutes': self.minutes,
+                'seconds': self.seconds,
+                'millis': self.millis,
+                'score': calculate_score(self.gems, self.minutes, self.seconds,
+                                         self.millis, self.lives),
+                'x': self.player_sprite.center_x,
+                'y': self.player_sprite.center_y}
+
+
+class MyGame(arcade.View):
+    ''' Main application class. '''
+
+    def __init__(self, frame_profiler=profiler.NULL_PROFILER):
+        ''' Run when an instance of the game is created '''
+        # Inherit all variables from __init__() of arcade.View
+        super().__init__()
+
+        # Variable to store the game state and logic
+        self.world = GameWorld()
+
+        # Variable to store the profiler timing each part of a frame
+        self.frame_profiler = frame_profiler
+        self.world.profiler = frame_profiler
+
+        # Variables to store whether the profiling overlay is shown, and its text
+        self.show_profile = False
+        self.profile_label = hud.TextLabel(10, SCREEN_HEIGHT - 10, arcade.csscolor.WHITE, 12,
+                                           anchor_y='top', font_name='Courier New')
+        self.profile_frames = 0
+
+        # Game stats shown on the screen, rendered again only when one of them changes
+        self.hud_label = hud.TextLabel(10, 10, arcade.csscolor.WHITE, 24)
+        self.hud_values = None
+
+        # Variable to store the replay recorder, if the game is being recorded
+        self.recorder = None
+
+        # Variable to store the viewport last set, which moves between physics steps
+        self.viewport = None
+
+    def setup(self, level):
+        ''' Sets up game to load new levels '''
+        # Load the level into the game world
+        self.world.setup(level)
+
+        # Set the map's background colour
+        if self.world.background_color:
+            arcade.set_background_color(self.world.background_color)
+
+    def restart(self):
+        ''' Starts a new game on the first level, restoring it rather than loading it again '''
+        self.world.restart()
+
+        # Draw the HUD and viewport again from scratch
+        self.hud_values = None
+        self.viewport = None
+
+        # Set the first map's background colour
+        if self.world.background_color:
+            arcade.set_background_color(self.world.background_color)
+
+    def on_draw(self):
+        ''' Render the screen. '''
+        with self.frame_profiler.section('draw'):
+            self.draw_frame()
+
+        # Draw the frame timings over the top, if they are shown
+        if self.show_profile:
+            self.draw_profile()
+
+    def draw_frame(self):
+        ''' Draws the map, player and game stats '''
+        # Clear the screen
+        arcade.start_render()
+
+        # Place the player and viewport between the last two physics steps
+        world = self.world
+        section = self.frame_profiler.section
+        player = world.player_sprite
+        position = player.position
+        x, y, view_left, view_bottom = world.interpolated()
+        player.position = (x, y)
+
+        # Scroll the viewport
+        if (view_left, view_bottom) != self.viewport:
+            self.viewport = (view_left, view_bottom)
+            arcade.set_viewport(view_left, SCREEN_WIDTH + view_left,
+                                view_bottom, SCREEN_HEIGHT + view_bottom)
+
+        # Area of the map on screen, plus a margin
+        cull_area = (view_left - CULLING_MARGIN,
+                     view_left + SCREEN_WIDTH + CULLING_MARGIN,
+                     view_bottom - CULLING_MARGIN,
+                     view_bottom + SCREEN_HEIGHT + CULLING_MARGIN)
+
+        # Draw the map's sprites
+        if CHUNKED_DRAWING:
+            layers = (('background', world.background_layer),
+                      ('walls', world.wall_layer),
+                      ('gems', world.gem_layer),
+                      ('ladders', world.ladder_layer),
+                      ('obstacles', world.dont_touch_layer),
+                      ('player', world.player_list),
+                      ('foreground', world.foreground_layer))
+        else:
+            layers = (('background', world.background_list),
+                      ('walls', world.wall_list),
+                      ('gems', world.gem_list),
+                      ('ladders', world.ladder_list),
+                      ('obstacles', world.dont_touch_list),
+                      ('player', world.player_list),
+                      ('foreground', world.foreground_list))
+
+        for name, layer in layers:
+            with section('draw ' + name):
+                if isinstance(layer, chunks.ChunkedLayer):
+                    layer.draw(*cull_area)
+                else:
+                    layer.draw()
+
+        # Put the player back where the physics left it
+        player.position = position
+
+        # Calculate the time elapsed
+        world.update_clock()
+
+        # Draw game stats on the screen
+        with section('draw hud'):
+            hud_values = (world.gems, world.lives, world.minutes, world.seconds)
+            if hud_values != self.hud_values:
+                self.hud_values = hud_values
+                game_text = 'Gems: {} | Lives: {} | Time: {:02d}:{:02d}'.format(*hud_values)
+                self.hud_label.set_text(game_text)
+            self.hud_label.draw()
+
+    def draw_profile(self):
+        ''' Draws the rolling frame timings in the top left of the screen '''
+        # Only refresh the text every so often, so it can be read and costs little
+        if self.profile_frames % PROFILE_OVERLAY_FRAMES == 0:
+            self.profile_label.set_text('\n'.join(['Section (ms)'] + self.frame_profiler.report()))
+        self.profile_frames += 1
+
+        self.profile_label.draw()
+
+    def on_key_press(self, key, modifiers):
+        ''' Called whenever a key is pressed. '''
+        # Toggle the profiling overlay, if profiling is on
+        if key == arcade.key.F3 and self.frame_profiler.enabled:
+            self.show_profile = not self.show_profile
+            self.profile_frames = 0
+            return
+
+        if self.recorder:
+            self.recorder.key_press(key)
+        self.world.key_press(key)
+
+    def on_key_release(self, key, modifiers):
+        ''' Called when the user releases a key. '''
+        if self.recorder:
+            self.recorder.key_release(key)
+        self.world.key_release(key)
+
+    def on_update(self, delta_time):
+        ''' Movement and game logic '''
+        world = self.world
+        level = world.level
+
+        # Record the time step, so the run can be replayed
+        if self.recorder:
+            self.recorder.update(delta_time)
+
+        # Step the game world's physics at its fixed rate
+        with self.frame_profiler.section('update'):
+            outcome = world.advance(delta_time)
+
+        # Set the new map's background colour after a level change
+        if world.level != level and world.level <= TOTAL_LEVELS and world.background_color:
+            arcade.set_background_color(world.background_color)
+
+        if outcome:
+            # Finish the recording with the results it should replay to
+            if self.recorder:
+                self.recorder.finish(world.summary(outcome))
+                self.recorder = None
+
+            # Draw the game over or death screen
+            view = GameOverView(outcome, world.gems, world.minutes,
+                                world.seconds, world.millis, world.lives)
+            view.game_view = self
+            self.window.show_view(view)
+
 
 def main():
     ''' Main method '''
+    # Read the command line options
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument('--record', help='file to record a replay of the run to')
+    parser.add_argument('--profile', action='store_true',
+                        help='time each part of a frame, toggling the timings overlay with F3')
+    parser.add_argument('--profile-output',
+                        help='file to write frame timings to on exit, as .csv or .json')
+    parser.add_argument('--physics-rate', type=int, default=PHYSICS_RATE,
+                        help='physics steps per second')
+    parser.add_argument('--frame-rate', type=int, default=FRAME_RATE,
+                        help='frames drawn per second')
+    parser.add_argument('--no-atlas', action='store_true',
+                        help='decode every image from its own file instead of the atlas cache')
+    args = parser.parse_args()
+
+    # Map the pre-decoded images into memory, building the atlas cache if any image has changed
+    if not args.no_atlas:
+        atlas.load(atlas_sources())
+
+    # Time each part of a frame, if asked to
+    frame_profiler = profiler.NULL_PROFILER
+    if args.profile or args.profile_output:
+        frame_profiler = profiler.FrameProfiler()
+
     # Create the game window using arcade.Window()
-    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
+    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE,
+                           update_rate=1 / args.frame_rate)
     # Create an instance of MyGame()
-    game_view = MyGame()
+    game_view = MyGame(frame_profiler)
+    game_view.world.physics_rate = args.physics_rate
+    # Start recording before the level is set up, so nothing is missed
+    if args.record:
+        game_view.recorder = replay.Recorder(args.record, game_view.world.level,
+                                             game_view.world.physics_engine_type,
+                                             args.physics_rate)
     # Set up game level
-    game_view.setup(game_view.level)
+    game_view.setup(game_view.world.level)
     # Show the game level
     window.show_view(game_view)
     # Run the game
     arcade.run()
+    # Keep whatever was recorded if the window is closed mid-run
+    if game_view.recorder:
+        game_view.recorder.close()
+    # Write the frame timings
+    if args.profile_output:
+        frame_profiler.dump(args.profile_output)
 
 
 if __name__ == '__main__': # If the file is being run directly and not imported:
@@ -0,0 +1,86 @@
+''' Time-based sprite animations, with frame tables shared by every sprite playing them '''
+
+# Index of a frame's original, unmirrored texture
+ORIGINAL = 0
+
+# Fraction of a frame that rounding errors in the time played are allowed to fall short by
+FRAME_TOLERANCE = 1e-6
+
+
+class Animation:
+    ''' The frames of one animation state and how long each is shown, shared by every sprite '''
+
+    def __init__(self, frames, frame_time=None, mirrored=True):
+        ''' Run when an animation is created
+
+        Each frame is indexed by facing direction, giving the texture facing that way.
+        A frame time of None shows the first frame only.
+        '''
+        # Frames of the animation, and the seconds each is shown for
+        self.frames = frames
+        self.frame_time = frame_time
+
+        # Whether the frames are mirrored to face left, or always face the original way
+        self.mirrored = mirrored
+
+        # Seconds the whole animation takes before it loops
+        self.loop_time = frame_time * len(frames) if frame_time else None
+
+        # Dictionary of direction -> textures of every frame, filled in when a direction is first played
+        self.tables = {}
+
+    def table(self, direction):
+        ''' Returns the texture of every frame facing a direction, looking them up only the first time '''
+        if not self.mirrored:
+            direction = ORIGINAL
+
+        table = self.tables.get(direction)
+        if table is None:
+            table = [frame[direction] for frame in self.frames]
+            self.tables[direction] = table
+        return table
+
+    def texture(self, direction, elapsed):
+        ''' Returns the texture shown a number of seconds into the animation '''
+        if not self.frame_time:
+            return self.table(direction)[0]
+        frame = int(elapsed / self.frame_time + FRAME_TOLERANCE)
+        return self.table(direction)[frame % len(self.frames)]
+
+
+class Animator:
+    ''' Which animation a sprite is playing and how far through it is '''
+
+    def __init__(self, animations):
+        ''' Run when an animated sprite is created '''
+        # Dictionary of state name -> animation, shared with every other sprite of the same kind
+        self.animations = animations
+
+        # Animation state being played, and the seconds it has played for
+        self.state = None
+        self.elapsed = 0.0
+
+        # Texture last shown, so the sprite is only changed when the frame does
+        self.texture = None
+
+    def update(self, state, direction, delta_time, playing=True):
+        ''' Advances the animation, returning the texture to show if it has changed, otherwise None
+
+        A state change starts its animation from the first frame.
+        While playing is false the current frame is held.
+        '''
+        animation = self.animations[state]
+
+        if state != self.state:
+            self.state = state
+            self.elapsed = 0.0
+        elif playing and animation.loop_time:
+            # Wrap the time around the loop, so it never grows large enough to lose precision
+            self.elapsed = (self.elapsed + delta_time) % animation.loop_time
+
+        texture = animation.texture(direction, self.elapsed)
+        if texture is self.texture:
+            return None
+
+        self.texture = texture
+        return texture
@@ -0,0 +1,227 @@
+''' Images decoded once into RGBA atlases cached on disk, and memory-mapped instead of decoded again '''
+
+# Import standard python libraries
+import hashlib
+import json
+import mmap
+import os
+import time
+
+# Building the atlases from the command line needs no window or display
+if __name__ == '__main__':
+    import pyglet
+    pyglet.options['headless'] = True
+
+# Import arcade python library and the image library it loads textures with
+import arcade
+import PIL.Image
+from arcade.resources import resolve_resource_path
+
+# Directory the atlases and their index are cached in
+ATLAS_DIRECTORY = 'atlas_cache'
+
+# File name of the index of every image in the atlases
+INDEX_FILE = 'index.json'
+
+# Format version of the index, so atlases from an older version are built again
+ATLAS_VERSION = 1
+
+# Start of the file names of images in arcade's resources
+RESOURCE_PREFIX = ':resources:'
+
+# Atlas loaded for this run, or None to decode every image from its own file
+_atlas = None
+
+
+def source_key(file_name):
+    ''' Returns the name an image is indexed by, the same however its path is written '''
+    if file_name.startswith(RESOURCE_PREFIX):
+        return file_name
+    return os.path.relpath(file_name).replace(os.sep, '/')
+
+
+def file_digest(path):
+    ''' Returns the SHA-1 digest of a file, in hex '''
+    with open(path, 'rb') as source_file:
+        return hashlib.sha1(source_file.read()).hexdigest()
+
+
+def source_stamp(path):
+    ''' Returns the size, modification time and digest recorded for a source image '''
+    stat = os.stat(path)
+    return {'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': file_digest(path)}
+
+
+def is_current(index, sources):
+    ''' Returns True if an index holds exactly the given sources, none of them changed since it was built
+
+    Sources whose size and modification time still match are not read again;
+    any others are hashed, so a file touched but not changed does not count.
+    '''
+    if index is None or index.get('version') != ATLAS_VERSION:
+        return False
+
+    stamps = index['sources']
+    if set(stamps) != {source_key(file_name) for file_name in sources}:
+        return False
+
+    for file_name in sources:
+        stamp = stamps[source_key(file_name)]
+        path = resolve_resource_path(file_name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size == stamp['size'] and stat.st_mtime_ns == stamp['mtime_ns']:
+            continue
+        if file_digest(path) != stamp['sha1']:
+            return False
+
+    return True
+
+
+def build_atlases(sources, directory=ATLAS_DIRECTORY):
+    ''' Decodes every source image and packs them into one RGBA atlas per image size
+
+    Images of a size are stacked in a single column, so each image's pixels are one
+    unbroken run of the atlas file and can be mapped without copying.
+    Returns the index written next to the atlases.
+    '''
+    os.makedirs(directory, exist_ok=True)
+
+    # Dictionary of (width, height) -> list of (source key, decoded image)
+    groups = {}
+    stamps = {}
+    for file_name in sources:
+        path = resolve_resource_path(file_name)
+        key = source_key(file_name)
+        stamps[key] = source_stamp(path)
+        image = PIL.Image.open(path).convert('RGBA')
+        groups.setdefault(image.size, []).append((key, image))
+
+    atlases = {}
+    images = {}
+    for (width, height), group in sorted(groups.items()):
+        atlas_name = '{}x{}.rgba'.format(width, height)
+        atlas_height = height * len(group)
+        atlases[atlas_name] = {'width': width, 'height': atlas_height}
+
+        temporary_name = os.path.join(directory, atlas_name + '.tmp')
+        with open(temporary_name, 'wb') as atlas_file:
+            for number, (key, image) in enumerate(group):
+                top = number * height
+                images[key] = {'atlas': atlas_name,
+                               'offset': top * width * 4,
+                               'x': 0, 'y': top, 'width': width, 'height': height,
+                               # Texture coordinates of the image's corners, from the top left of the atlas
+                               'uv': [0.0, top / atlas_height, 1.0, (top + height) / atlas_height]}
+                atlas_file.write(image.tobytes())
+        os.replace(temporary_name, os.path.join(directory, atlas_name))
+
+    # The index is written last, so it never points to atlases that were only partly written
+    index = {'version': ATLAS_VERSION, 'sources': stamps, 'atlases': atlases, 'images': images}
+    temporary_name = os.path.join(directory, INDEX_FILE + '.tmp')
+    with open(temporary_name, 'w') as index_file:
+        json.dump(index, index_file)
+    os.replace(temporary_name, os.path.join(directory, INDEX_FILE))
+
+    return index
+
+
+def read_index(directory=ATLAS_DIRECTORY):
+    ''' Reads the index of the cached atlases, returning None if there is none '''
+    try:
+        with open(os.path.join(directory, INDEX_FILE)) as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return None
+
+
+class Atlas:
+    ''' Cached atlases mapped into memory, handing out their images without decoding or copying them '''
+
+    def __init__(self, index, directory=ATLAS_DIRECTORY):
+        ''' Run when the cached atlases are loaded '''
+        # Dictionary of source key -> where the image is in the atlases
+        self.images = index['images']
+
+        # Dictionary of atlas file name -> the whole file mapped into memory, read in one go by the OS
+        self.buffers = {}
+        for atlas_name in index['atlases']:
+            with open(os.path.join(directory, atlas_name), 'rb') as atlas_file:
+                self.buffers[atlas_name] = memoryview(mmap.mmap(atlas_file.fileno(), 0,
+                                                                access=mmap.ACCESS_READ))
+
+    def image(self, file_name):
+        ''' Returns a source image read straight out of its atlas, or None if it is not in one '''
+        entry = self.images.get(source_key(file_name))
+        if entry is None:
+            return None
+
+        size = entry['width'] * entry['height'] * 4
+        pixels = self.buffers[entry['atlas']][entry['offset']:entry['offset'] + size]
+        return PIL.Image.frombuffer('RGBA', (entry['width'], entry['height']), pixels,
+                                    'raw', 'RGBA', 0, 1)
+
+    def register(self, file_name):
+        ''' Adds a source image to arcade's texture cache under the name it is loaded by
+
+        arcade.load_texture() then crops or mirrors the cached image instead of
+        decoding the file. Returns False if the image is not in the atlases.
+        '''
+        texture_cache = arcade.load_texture.texture_cache
+        if file_name in texture_cache:
+            return True
+
+        image = self.image(file_name)
+        if image is None:
+            return False
+
+        texture_cache[file_name] = arcade.Texture(file_name, image)
+        return True
+
+
+def load(sources, directory=ATLAS_DIRECTORY):
+    ''' Loads the cached atlases of the given images, building them first if any image has changed
+
+    Returns the atlas, or None if it could not be built, in which case images are decoded as usual.
+    '''
+    global _atlas
+
+    index = read_index(directory)
+    try:
+        if not is_current(index, sources):
+            index = build_atlases(sources, directory)
+        _atlas = Atlas(index, directory)
+    except OSError as error:
+        print('Warning, not using the atlas cache: {}'.format(error))
+        _atlas = None
+
+    return _atlas
+
+
+def register(file_name):
+    ''' Adds an image to arcade's texture cache from the loaded atlas, if there is one '''
+    if _atlas is not None:
+        _atlas.register(file_name)
+
+
+def main():
+    ''' Builds the atlases of the game's images '''
+    # Imported here, as the game imports this module
+    import Platformer
+
+    start_time = time.perf_counter()
+    index = build_atlases(Platformer.atlas_sources())
+    elapsed = time.perf_counter() - start_time
+    for atlas_name, atlas in sorted(index['atlases'].items()):
+        print('Built {} ({}x{})'.format(os.path.join(ATLAS_DIRECTORY, atlas_name),
+                                        atlas['width'], atlas['height']))
+    print('Packed {} images in {:.2f}s'.format(len(index['images']), elapsed))
+
+
+if __name__ == '__main__': # If the file is being run directly and not imported:
+    # Build the atlases
+    main()
@@ -0,0 +1,317 @@
+''' Benchmarks of level loading, headless playthroughs and culling, on the real and synthetic maps '''
+
+# Import standard python libraries
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+
+# Run pyglet without a window or display, so no GPU is needed
+import pyglet
+pyglet.options['headless'] = True
+
+# Import the game and its headless simulation
+import levels
+import Platformer
+import simulate
+
+# Physics engines each playthrough is timed with
+ENGINES = ('grid', 'arcade')
+
+# Sizes of the synthetic stress maps, in tiles
+DEFAULT_STRESS_SIZES = ('250x50', '1000x200')
+
+# Chance of each empty cell of a stress map holding a gem
+DEFAULT_GEM_DENSITY = 0.1
+
+# Chance of each column of a stress map holding a ladder
+DEFAULT_LADDER_DENSITY = 0.05
+
+# Chance of each cell above the ground of a stress map starting a floating platform
+DEFAULT_PLATFORM_DENSITY = 0.03
+
+# Length in tiles of each floating platform of a stress map
+PLATFORM_LENGTH = 6
+
+# Rows of solid ground along the bottom of a stress map
+GROUND_ROWS = 2
+
+# Columns and rows around the player's spawn point kept clear on a stress map
+SPAWN_CLEARANCE = 10
+
+# Level whose tileset and tiles the stress maps are built from
+STRESS_TILESET_LEVEL = 1
+
+# Number of ticks of each headless playthrough
+DEFAULT_TICKS = 3600
+
+# Most views the culling of a map is timed over, spread evenly across the map
+MAX_CULLING_VIEWS = 100
+
+
+def count_sprites(prepared):
+    ''' Returns the number of sprites in each layer of a prepared level '''
+    return {'background': len(prepared.background_list),
+            'foreground': len(prepared.foreground_list),
+            'platforms': len(prepared.wall_list),
+            'gems': len(prepared.gem_list),
+            'obstacles': len(prepared.dont_touch_list),
+            'ladders': len(prepared.ladder_list)}
+
+
+def measure_load(prepare, repeat):
+    ''' Times preparing a level, first when nothing is cached and then repeatedly
+
+    Returns the first time, the median of the repeats and the last prepared level.
+    '''
+    times = []
+    prepared = None
+    for _ in range(repeat + 1):
+        # Decode the map again every time, as the game does on a cold start
+        levels.clear_cache()
+        start_time = time.perf_counter()
+        prepared = prepare()
+        times.append(time.perf_counter() - start_time)
+    return times[0], statistics.median(times[1:] or times), prepared
+
+
+def measure_memory(prepare):
+    ''' Returns the Python memory held by a prepared level and the peak while preparing it, in bytes '''
+    levels.clear_cache()
+    tracemalloc.start()
+    prepared = prepare()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del prepared
+    return current, peak
+
+
+def measure_playthrough(level, prepare, engine, ticks):
+    ''' Returns the ticks simulated and ticks per second of a scripted headless playthrough '''
+    world = Platformer.GameWorld()
+    world.physics_engine_type = engine
+    world.level = level
+    world.setup(level, prepare())
+
+    # Let the next level finish preloading, so it does not compete with the playthrough
+    for future in list(Platformer.level_preloader.pending.values()):
+        future.result()
+
+    events = simulate.default_script(ticks)
+    start_time = time.perf_counter()
+    ticks_run, _ = simulate.run(world, events, ticks)
+    elapsed = time.perf_counter() - start_time
+    return ticks_run, ticks_run / elapsed
+
+
+def measure_culling(prepared, width, height):
+    ''' Times finding the tiles on screen for views swept across a level's map
+
+    Compares the chunked layers against checking every sprite, returning milliseconds per
+    view for each and the average number of sprites in the chunks that would be drawn.
+    '''
+    map_width = width * Platformer.GRID_PIXEL_SIZE
+    map_height = height * Platformer.GRID_PIXEL_SIZE
+    margin = Platformer.CULLING_MARGIN
+
+    # Views a screen apart in both directions, covering the whole map
+    areas = []
+    for view_left in range(0, int(max(map_width - Platformer.SCREEN_WIDTH, 0)) + 1,
+                           Platformer.SCREEN_WIDTH // 2):
+        for view_bottom in range(0, int(max(map_height - Platformer.SCREEN_HEIGHT, 0)) + 1,
+                                 Platformer.SCREEN_HEIGHT // 2):
+            areas.append((view_left - margin, view_left + Platformer.SCREEN_WIDTH + margin,
+                          view_bottom - margin, view_bottom + Platformer.SCREEN_HEIGHT + margin))
+    areas = areas[::math.ceil(len(areas) / MAX_CULLING_VIEWS)]
+
+    layers = [(prepared.background_layer, prepared.background_list),
+              (prepared.foreground_layer, prepared.foreground_list),
+              (prepared.wall_layer, prepared.wall_list),
+              (prepared.gem_layer, prepared.gem_list),
+              (prepared.dont_touch_layer, prepared.dont_touch_list),
+              (prepared.ladder_layer, prepared.ladder_list)]
+
+    # Chunked culling, as drawn by the game
+    drawn = 0
+    start_time = time.perf_counter()
+    for left, right, bottom, top in areas:
+        for layer, _ in layers:
+            for chunk in layer.visible_chunks(left, right, bottom, top):
+                drawn += len(chunk)
+    chunked_time = time.perf_counter() - start_time
+
+    # Culling each sprite on its own, for comparison
+    start_time = time.perf_counter()
+    for left, right, bottom, top in areas:
+        for _, sprite_list in layers:
+            for sprite in sprite_list:
+                if sprite.right >= left and sprite.left <= right \
+                        and sprite.top >= bottom and sprite.bottom <= top:
+                    pass
+    sprite_time = time.perf_counter() - start_time
+
+    return {'views': len(areas),
+            'chunked_ms': 1000 * chunked_time / len(areas),
+            'per_sprite_ms': 1000 * sprite_time / len(areas),
+            'sprites_drawn': drawn / len(areas)}
+
+
+def most_common_gid(level_data, layer_name):
+    ''' Returns the tile used most often in a layer of a decoded level '''
+    return Counter(gid for gid in level_data.layers[layer_name] if gid).most_common(1)[0][0]
+
+
+def synthetic_level(width, height, gem_density=DEFAULT_GEM_DENSITY,
+                    ladder_density=DEFAULT_LADDER_DENSITY,
+                    platform_density=DEFAULT_PLATFORM_DENSITY, seed=0):
+    ''' Generates a stress map of the given size in tiles, using a real level's tiles
+
+    The map has solid ground, floating platforms, ladders running from the ground
+    up to random heights and gems scattered through the empty cells.
+    '''
+    source = levels.read_level(STRESS_TILESET_LEVEL)
+    platform_gid = most_common_gid(source, 'Platforms')
+    ladder_gid = most_common_gid(source, 'Ladders')
+    gem_gid = most_common_gid(source, 'Gems')
+
+    rng = random.Random(seed)
+    platforms = [0] * (width * height)
+    ladders = [0] * (width * height)
+    gems = [0] * (width * height)
+
+    def index(column, row):
+        ''' Returns the position in a layer of a cell, counting rows up from the bottom '''
+        return (height - row - 1) * width + column
+
+    def near_spawn(column, row):
+        ''' Returns True if a cell is close to where the player spawns '''
+        return column < SPAWN_CLEARANCE and row < SPAWN_CLEARANCE
+
+    # Solid ground along the bottom
+    for row in range(min(GROUND_ROWS, height)):
+        for column in range(width):
+            platforms[index(column, row)] = platform_gid
+
+    # Floating platforms
+    for row in range(GROUND_ROWS + 2, height):
+        for column in range(width):
+            if rng.random() < platform_density:
+                for offset in range(PLATFORM_LENGTH):
+                    if column + offset < width and not near_spawn(column + offset, row):
+                        platforms[index(column + offset, row)] = platform_gid
+
+    # Ladders climbing from the ground
+    for column in range(width):
+        if rng.random() < ladder_density and not near_spawn(column, GROUND_ROWS):
+            for row in range(GROUND_ROWS, rng.randint(GROUND_ROWS + 1, height)):
+                if not platforms[index(column, row)]:
+                    ladders[index(column, row)] = ladder_gid
+
+    # Gems in the remaining empty cells
+    for row in range(GROUND_ROWS, height):
+        for column in range(width):
+            cell = index(column, row)
+            if not platforms[cell] and not ladders[cell] and not near_spawn(column, row) \
+                    and rng.random() < gem_density:
+                gems[cell] = gem_gid
+
+    layers = {'Background': [0] * (width * height),
+              'Platforms': platforms,
+              'Ladders': ladders,
+              'Gems': gems,
+              'Obstacles': [0] * (width * height),
+              'Foreground': [0] * (width * height)}
+    layer_opacity = {layer_name: None for layer_name in layers}
+
+    return levels.LevelData('synthetic {}x{}'.format(width, height), width, height,
+                            source.tile_width, source.tile_height, source.background_color,
+                            source.tiles, layers, layer_opacity)
+
+
+def benchmark(name, level, prepare, width, height, repeat, ticks):
+    ''' Runs every benchmark on one map, returning the results '''
+    cold, warm, prepared = measure_load(prepare, repeat)
+    current, peak = measure_memory(prepare)
+    results = {'map': name,
+               'size': '{}x{}'.format(width, height),
+               'load_cold_ms': 1000 * cold,
+               'load_warm_ms': 1000 * warm,
+               'memory_kib': current / 1024,
+               'memory_peak_kib': peak / 1024,
+               'sprites': count_sprites(prepared),
+               'culling': measure_culling(prepared, width, height),
+               'ticks_per_sec': {}}
+    for engine in ENGINES:
+        ticks_run, rate = measure_playthrough(level, prepare, engine, ticks)
+        results['ticks_per_sec'][engine] = rate
+        results['ticks_run'] = ticks_run
+    return results
+
+
+def print_results(results):
+    ''' Prints the results of one map's benchmarks '''
+    print('{} ({} tiles)'.format(results['map'], results['size']))
+    print('  Load: {:.1f} ms cold | {:.1f} ms warm | Memory: {:.0f} KiB held, {:.0f} KiB peak'.format(
+        results['load_cold_ms'], results['load_warm_ms'],
+        results['memory_kib'], results['memory_peak_kib']))
+    print('  Sprites: ' + ' | '.join('{}: {}'.format(layer, count)
+                                     for layer, count in results['sprites'].items()))
+    culling = results['culling']
+    print('  Culling: {:.3f} ms chunked | {:.3f} ms per sprite | {:.0f} sprites drawn per view'.format(
+        culling['chunked_ms'], culling['per_sprite_ms'], culling['sprites_drawn']))
+    print('  Playthrough ({} ticks): '.format(results['ticks_run'])
+          + ' | '.join('{}: {:.0f} ticks/sec'.format(engine, rate)
+                       for engine, rate in results['ticks_per_sec'].items()))
+
+
+def main():
+    ''' Main method '''
+    parser = argparse.ArgumentParser(description='Benchmark level loading, playthroughs and culling.')
+    parser.add_argument('--levels', type=int, nargs='*',
+                        default=list(range(1, Platformer.TOTAL_LEVELS + 1)),
+                        help='real levels to benchmark')
+    parser.add_argument('--stress', nargs='*', default=list(DEFAULT_STRESS_SIZES),
+                        help='sizes of synthetic stress maps, as WIDTHxHEIGHT in tiles')
+    parser.add_argument('--gem-density', type=float, default=DEFAULT_GEM_DENSITY,
+                        help='chance of each empty cell of a stress map holding a gem')
+    parser.add_argument('--ladder-density', type=float, default=DEFAULT_LADDER_DENSITY,
+                        help='chance of each column of a stress map holding a ladder')
+    parser.add_argument('--repeat', type=int, default=3, help='warm loads to take the median of')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS, help='ticks of each playthrough')
+    parser.add_argument('--json', help='file to write the results to')
+    args = parser.parse_args()
+
+    all_results = []
+
+    for level in args.levels:
+        level_data = levels.read_level(level)
+        results = benchmark(levels.level_file(level), level,
+                            lambda level=level: Platformer.PreparedLevel(level),
+                            level_data.width, level_data.height, args.repeat, args.ticks)
+        print_results(results)
+        all_results.append(results)
+
+    for size in args.stress:
+        width, height = (int(value) for value in size.lower().split('x'))
+        level_data = synthetic_level(width, height, args.gem_density, args.ladder_density)
+
+        # The last level is used, so reaching the end of the map ends the playthrough
+        level = Platformer.TOTAL_LEVELS
+        results = benchmark(level_data.file_name, level,
+                            lambda: Platformer.PreparedLevel(level, level_data),
+                            width, height, args.repeat, args.ticks)
+        print_results(results)
+        all_results.append(results)
+
+    if args.json:
+        with open(args.json, 'w') as output_file:
+            json.dump(all_results, output_file, indent=2)
+
+
+if __name__ == '__main__': # If the file is being run directly and not imported:
+    # Run the benchmarks
+    main()
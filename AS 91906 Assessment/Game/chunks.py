@@ -0,0 +1,74 @@
+''' Tile layers split into chunks, so only the chunks on screen are drawn '''
+
+# Import arcade python library
+import arcade
+
+
+class ChunkedLayer:
+    ''' A tile layer split into square chunks, each drawn as a single batch '''
+
+    def __init__(self, sprite_list, chunk_size, is_static=True):
+        ''' Run when a layer is split into chunks '''
+        # Width and height of each chunk in pixels
+        self.chunk_size = chunk_size
+
+        # Dictionary of (chunk column, chunk row) -> sprite list of the tiles centred in that chunk
+        self.chunks = {}
+
+        # Dictionary of (chunk column, chunk row) -> (left, right, bottom, top) edges of its tiles
+        self.bounds = {}
+
+        for sprite in sprite_list:
+            key = (int(sprite.center_x // chunk_size), int(sprite.center_y // chunk_size))
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                # Static chunks are uploaded to the GPU once, as their tiles never move
+                chunk = arcade.SpriteList(is_static=is_static)
+                self.chunks[key] = chunk
+                self.bounds[key] = (sprite.left, sprite.right, sprite.bottom, sprite.top)
+            chunk.append(sprite)
+
+            # Tiles can overhang their chunk, so track the true extent of each chunk
+            left, right, bottom, top = self.bounds[key]
+            self.bounds[key] = (min(left, sprite.left), max(right, sprite.right),
+                                min(bottom, sprite.bottom), max(top, sprite.top))
+
+        # Widest overhang of any chunk past its square, in whole chunks
+        self.overhang = 0
+        for (column, row), (left, right, bottom, top) in self.bounds.items():
+            start_x = column * chunk_size
+            start_y = row * chunk_size
+            overhang = max(start_x - left, right - start_x - chunk_size,
+                           start_y - bottom, top - start_y - chunk_size, 0)
+            self.overhang = max(self.overhang, int(-(-overhang // chunk_size)))
+
+    def restore(self, sprite):
+        ''' Puts a sprite removed from the layer back into its chunk, as when the layer was split '''
+        key = (int(sprite.center_x // self.chunk_size), int(sprite.center_y // self.chunk_size))
+        self.chunks[key].append(sprite)
+
+    def visible_chunks(self, left, right, bottom, top):
+        ''' Returns the chunks that intersect a rectangle of the map '''
+        first_column = int(left // self.chunk_size) - self.overhang
+        last_column = int(right // self.chunk_size) + self.overhang
+        first_row = int(bottom // self.chunk_size) - self.overhang
+        last_row = int(top // self.chunk_size) + self.overhang
+
+        # Only the chunk keys inside the rectangle are looked up, so the cost
+        # depends on the size of the screen rather than the size of the map
+        visible = []
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                chunk = self.chunks.get((column, row))
+                if not chunk:
+                    continue
+                chunk_left, chunk_right, chunk_bottom, chunk_top = self.bounds[(column, row)]
+                if chunk_right >= left and chunk_left <= right \
+                        and chunk_top >= bottom and chunk_bottom <= top:
+                    visible.append(chunk)
+        return visible
+
+    def draw(self, left, right, bottom, top):
+        ''' Draws the chunks that intersect a rectangle of the map '''
+        for chunk in self.visible_chunks(left, right, bottom, top):
+            chunk.draw()
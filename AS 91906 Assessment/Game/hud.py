@@ -0,0 +1,76 @@
+''' Text drawn in screen space, rendered again only when it changes '''
+
+# Import arcade python library
+import arcade
+
+
+class TextLabel:
+    ''' Text fixed to a point on the screen, rendered to a texture only when it changes '''
+
+    def __init__(self, x, y, color, font_size, anchor_x='left', anchor_y='baseline',
+                 align='left', font_name=('calibri', 'arial')):
+        ''' Run when a label is created, with its position in screen coordinates '''
+        # Screen position and anchoring of the text, as in arcade.draw_text()
+        self.x = x
+        self.y = y
+        self.anchor_x = anchor_x
+        self.anchor_y = anchor_y
+
+        # Appearance of the text
+        self.color = color
+        self.font_size = font_size
+        self.align = align
+        self.font_name = font_name
+
+        # Text currently rendered, if any
+        self.text = None
+
+        # Sprite showing the rendered text, in a list of its own so it is drawn as one batch
+        self.sprite = None
+        self.sprite_list = None
+
+    def set_text(self, text):
+        ''' Changes the text, rendering it only if it is different to the current text '''
+        if text == self.text:
+            return
+        self.text = text
+
+        # Render the text with the same method as arcade.draw_text()
+        image = arcade.get_text_image(text, self.color, self.font_size,
+                                      align=self.align, font_name=self.font_name)
+        name = 'TextLabel {} {} {} {} {}'.format(text, self.color, self.font_size,
+                                                 self.align, self.font_name)
+        # Make a new sprite and list for each text, as a sprite list keeps every texture it
+        # has ever held in its atlas, which would otherwise grow with every change of text
+        self.sprite = arcade.Sprite()
+        self.sprite.texture = arcade.Texture(name, image, hit_box_algorithm='None')
+
+        # Anchor the sprite the same way as arcade.draw_text()
+        if self.anchor_x == 'left':
+            self.sprite.center_x = self.x + self.sprite.width / 2
+        elif self.anchor_x == 'center':
+            self.sprite.center_x = self.x
+        else:
+            self.sprite.center_x = self.x - self.sprite.width / 2
+
+        if self.anchor_y == 'top':
+            self.sprite.center_y = self.y - self.sprite.height / 2
+        elif self.anchor_y == 'center':
+            self.sprite.center_y = self.y
+        else:
+            self.sprite.center_y = self.y + self.sprite.height / 2
+
+        self.sprite_list = arcade.SpriteList()
+        self.sprite_list.append(self.sprite)
+
+    def draw(self):
+        ''' Draws the label at its position on the screen, whatever part of the map is in view '''
+        if self.sprite_list is None:
+            return
+
+        # Draw with the projection reset to the screen, so the label never has to move
+        window = arcade.get_window()
+        view = window.ctx.projection_2d
+        window.ctx.projection_2d = (0, window.width, 0, window.height)
+        self.sprite_list.draw()
+        window.ctx.projection_2d = view
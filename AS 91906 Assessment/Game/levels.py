@@ -0,0 +1,402 @@
+''' Loading, caching and compiling of the game's Tiled levels '''
+
+# Import standard python libraries
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+# Compiling levels from the command line needs no window or display
+if __name__ == '__main__':
+    import pyglet
+    pyglet.options['headless'] = True
+
+# Import arcade python library and its Tiled map parser
+import arcade
+import pytiled_parser
+
+# Import the game's cache of pre-decoded images
+import atlas
+
+# File directory of maps
+LEVEL_FILE = 'levels/map1_level_{}.tmx'
+
+# File extension of compiled maps, stored next to their source map
+COMPILED_EXTENSION = '.lvl'
+
+# Identifier and format version at the start of every compiled map
+COMPILED_MAGIC = b'PLVL'
+COMPILED_VERSION = 1
+
+# Compiled map header: magic, version, source hash, map size, tile size,
+# background colour length and RGBA values, layer count and tile count
+HEADER_FORMAT = struct.Struct('<4sH20sHHHHB4BBH')
+
+# Compiled tileset entry: GID, image size and length of the image path
+TILE_FORMAT = struct.Struct('<HHHH')
+
+# Compiled layer header: layer opacity and length of the layer name
+LAYER_FORMAT = struct.Struct('<fB')
+
+# Largest GID that fits in a compiled layer grid
+MAX_COMPILED_GID = 0xFFFF
+
+# Worker threads decoding a level's tile images at the same time
+TILE_LOADER_THREADS = 8
+
+# Decoded levels, keyed by file name and stored alongside the file's modification time
+_level_cache = {}
+
+
+class LevelData:
+    ''' A decoded level: map size, background colour, tileset manifest and layer GID grids '''
+
+    def __init__(self, file_name, width, height, tile_width, tile_height,
+                 background_color, tiles, layers, layer_opacity):
+        ''' Run when a decoded level is created '''
+        # File the level was decoded from
+        self.file_name = file_name
+
+        # Size of the map in tiles
+        self.width = width
+        self.height = height
+
+        # Size of each tile in pixels, before scaling
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+
+        # Background colour of the map, or None if it has none
+        self.background_color = background_color
+
+        # Dictionary of GID -> (image file, image width, image height), of the tiles placed in the map
+        self.tiles = tiles
+
+        # Dictionary of layer name -> row-major sequence of GIDs, top row first
+        self.layers = layers
+
+        # Dictionary of layer name -> layer opacity, or None if unset
+        self.layer_opacity = layer_opacity
+
+
+def level_file(level):
+    ''' Returns the file name of a level's map '''
+    return LEVEL_FILE.format(level)
+
+
+def compiled_file(map_name):
+    ''' Returns the file name of a map's compiled form '''
+    return os.path.splitext(map_name)[0] + COMPILED_EXTENSION
+
+
+def source_digest(map_name):
+    ''' Returns the SHA-1 digest of a map's source file '''
+    with open(map_name, 'rb') as map_file:
+        return hashlib.sha1(map_file.read()).digest()
+
+
+def decode_map(map_name):
+    ''' Parses a Tiled map into a LevelData, rejecting features the game does not use '''
+    my_map = arcade.tilemap.read_tmx(map_name)
+    map_directory = os.path.dirname(os.path.abspath(map_name))
+
+    # Flatten every tile layer into a row-major GID grid
+    layers = {}
+    layer_opacity = {}
+    for layer in my_map.layers:
+        if not isinstance(layer, pytiled_parser.objects.TileLayer):
+            continue
+        layers[layer.name] = [gid for row in layer.layer_data for gid in row]
+        layer_opacity[layer.name] = layer.opacity
+
+    # Build the tileset manifest from only the tiles the layers place, as a
+    # tileset can hold many more tiles than one map uses
+    gids = used_gids(layers.values())
+    tiles = {}
+    for first_gid, tileset in my_map.tile_sets.items():
+        if tileset.image is not None:
+            raise ValueError('{}: sprite sheet tilesets are not supported'.format(map_name))
+        for tile_id, tile in tileset.tiles.items():
+            if first_gid + tile_id not in gids:
+                continue
+            if tile.animation or tile.objectgroup or tile.properties or tile.type_:
+                raise ValueError('{}: tile {} uses animation, hit boxes or properties, '
+                                 'which are not supported'.format(map_name, tile_id))
+            image_file = os.path.join(map_directory, tile.image.source)
+            tiles[first_gid + tile_id] = (image_file,
+                                          tile.image.size.width,
+                                          tile.image.size.height)
+
+    return LevelData(map_name, my_map.map_size.width, my_map.map_size.height,
+                     my_map.tile_size.width, my_map.tile_size.height,
+                     my_map.background_color, tiles, layers, layer_opacity)
+
+
+def _pad(data):
+    ''' Pads a bytearray to an even length so the next GID grid is aligned '''
+    if len(data) % 2:
+        data.append(0)
+
+
+def compile_level(map_name, output_name=None):
+    ''' Compiles a Tiled map into a compact binary file of uint16 GID grids '''
+    level_data = decode_map(map_name)
+    map_directory = os.path.dirname(os.path.abspath(map_name))
+
+    # Background colour is stored as RGBA, with its original length
+    background_color = tuple(level_data.background_color or ())
+    rgba = background_color + (0,) * (4 - len(background_color))
+
+    data = bytearray(HEADER_FORMAT.pack(COMPILED_MAGIC, COMPILED_VERSION,
+                                        source_digest(map_name),
+                                        level_data.width, level_data.height,
+                                        level_data.tile_width, level_data.tile_height,
+                                        len(background_color), *rgba,
+                                        len(level_data.layers), len(level_data.tiles)))
+
+    # Tileset manifest, with image paths relative to the map
+    for gid, (image_file, width, height) in sorted(level_data.tiles.items()):
+        if gid > MAX_COMPILED_GID:
+            raise ValueError('{}: GID {} does not fit in a compiled layer'.format(map_name, gid))
+        path = os.path.relpath(image_file, map_directory).encode('utf-8')
+        data += TILE_FORMAT.pack(gid, width, height, len(path))
+        data += path
+
+    # Layer grids, each aligned to start on an even offset
+    for layer_name, grid in level_data.layers.items():
+        if max(grid, default=0) > MAX_COMPILED_GID:
+            raise ValueError('{}: layer {} has flipped or out of range tiles'.format(map_name,
+                                                                                 layer_name))
+        name = layer_name.encode('utf-8')
+        opacity = level_data.layer_opacity[layer_name]
+        _pad(data)
+        data += LAYER_FORMAT.pack(-1.0 if opacity is None else opacity, len(name))
+        data += name
+        _pad(data)
+        grid = array('H', grid)
+        if sys.byteorder != 'little':
+            grid.byteswap()
+        data += grid.tobytes()
+
+    if output_name is None:
+        output_name = compiled_file(map_name)
+    with open(output_name, 'wb') as output_file:
+        output_file.write(data)
+
+    return output_name
+
+
+def read_compiled(file_name, digest=None):
+    ''' Memory-maps a compiled map, returning None if it is missing, cut short, outdated or not for this source '''
+    try:
+        with open(file_name, 'rb') as compiled:
+            buffer = mmap.mmap(compiled.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(buffer) < HEADER_FORMAT.size:
+        return None
+    (magic, version, source_hash, width, height, tile_width, tile_height,
+     color_length, red, green, blue, alpha, layer_count, tile_count) = HEADER_FORMAT.unpack_from(buffer)
+    if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+        return None
+    if digest is not None and source_hash != digest:
+        return None
+
+    background_color = (red, green, blue, alpha)[:color_length] or None
+    map_directory = os.path.dirname(os.path.abspath(file_name))
+    offset = HEADER_FORMAT.size
+
+    # A map cut short, such as by a crash while it was written, is read as missing,
+    # so every part is checked to lie inside the file before it is read
+    size = len(buffer)
+
+    # Read the tileset manifest
+    tiles = {}
+    for _ in range(tile_count):
+        if offset + TILE_FORMAT.size > size:
+            return None
+        gid, tile_width_px, tile_height_px, path_length = TILE_FORMAT.unpack_from(buffer, offset)
+        offset += TILE_FORMAT.size
+        if offset + path_length > size:
+            return None
+        try:
+            path = buffer[offset:offset + path_length].decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        offset += path_length
+        tiles[gid] = (os.path.join(map_directory, path), tile_width_px, tile_height_px)
+
+    # Map each layer's GID grid straight out of the file
+    view = memoryview(buffer)
+    cell_count = width * height
+    layers = {}
+    layer_opacity = {}
+    for _ in range(layer_count):
+        offset += offset % 2
+        if offset + LAYER_FORMAT.size > size:
+            return None
+        opacity, name_length = LAYER_FORMAT.unpack_from(buffer, offset)
+        offset += LAYER_FORMAT.size
+        if offset + name_length > size:
+            return None
+        try:
+            layer_name = buffer[offset:offset + name_length].decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        offset += name_length
+        offset += offset % 2
+        if offset + cell_count * 2 > size:
+            return None
+        grid = view[offset:offset + cell_count * 2]
+        if sys.byteorder == 'little':
+            grid = grid.cast('H')
+        else:
+            grid = array('H', grid)
+            grid.byteswap()
+        offset += cell_count * 2
+        layers[layer_name] = grid
+        layer_opacity[layer_name] = None if opacity < 0 else opacity
+
+    return LevelData(file_name, width, height, tile_width, tile_height,
+                     background_color, tiles, layers, layer_opacity)
+
+
+def read_level(level):
+    ''' Reads a level, from its compiled form if it is up to date, decoding each file only once '''
+    map_name = level_file(level)
+    modified = os.path.getmtime(map_name)
+
+    # Decode the level again only if it is new or has been edited since it was cached
+    cached = _level_cache.get(map_name)
+    if cached is None or cached[0] != modified:
+        level_data = read_compiled(compiled_file(map_name), source_digest(map_name))
+        if level_data is None:
+            level_data = decode_map(map_name)
+        cached = (modified, level_data)
+        _level_cache[map_name] = cached
+
+    return cached[1]
+
+
+def used_gids(grids):
+    ''' Returns the set of GIDs placed in any of the given layer grids, leaving out empty squares '''
+    gids = set()
+    for grid in grids:
+        gids.update(grid)
+    gids.discard(0)
+    return gids
+
+
+def load_tile_texture(tile):
+    ''' Decodes one tile's image into arcade's texture cache, as a sprite of the tile would load it '''
+    image_file, width, height = tile
+    # Take the image from the atlas cache, if it is loaded, instead of decoding its file
+    atlas.register(image_file)
+    return arcade.load_texture(image_file, 0, 0, width, height)
+
+
+def load_tile_textures(level_data, workers=TILE_LOADER_THREADS):
+    ''' Decodes the images of only the tiles a level places, several at once on a thread pool
+
+    Sprites built afterwards find their textures already in arcade's cache.
+    Returns the number of tile images loaded.
+    '''
+    gids = used_gids(level_data.layers.values())
+    tiles = {level_data.tiles[gid] for gid in gids if gid in level_data.tiles}
+
+    # Image decoding releases the GIL, so the images decode in parallel
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tile-loader') as executor:
+        textures = list(executor.map(load_tile_texture, tiles))
+
+    return len(textures)
+
+
+def build_layer(level_data, layer_name, scaling, use_spatial_hash=None):
+    ''' Creates the sprites for one layer of a decoded level '''
+    sprite_list = arcade.SpriteList(use_spatial_hash=use_spatial_hash)
+
+    grid = level_data.layers.get(layer_name)
+    if grid is None:
+        print("Warning, no layer named '{}'.".format(layer_name))
+        return sprite_list
+
+    # Scaled size of each grid cell
+    cell_width = level_data.tile_width * scaling
+    cell_height = level_data.tile_height * scaling
+    opacity = level_data.layer_opacity.get(layer_name)
+
+    for index, gid in enumerate(grid):
+        # Check for empty square
+        if gid == 0:
+            continue
+
+        tile = level_data.tiles.get(gid)
+        if tile is None:
+            print("Warning, couldn't find tile for item {} in layer '{}' in file '{}'.".format(
+                gid, layer_name, level_data.file_name))
+            continue
+
+        # Place the sprite in its cell, counting rows from the top of the map
+        row, column = divmod(index, level_data.width)
+        image_file, width, height = tile
+        my_sprite = arcade.Sprite(image_file, scaling, 0, 0, width, height)
+        my_sprite.center_x = column * cell_width + my_sprite.width / 2
+        my_sprite.center_y = (level_data.height - row - 1) * cell_height + my_sprite.height / 2
+
+        if opacity:
+            my_sprite.alpha = int(opacity * 255)
+
+        sprite_list.append(my_sprite)
+
+    return sprite_list
+
+
+class LevelPreloader:
+    ''' Prepares levels on a worker thread, so they are ready before they are needed '''
+
+    def __init__(self, prepare):
+        ''' Run when a preloader is created, with the function that prepares a level '''
+        # Function taking a level number and returning the prepared level
+        self.prepare = prepare
+
+        # Single worker thread, so levels are prepared one at a time in request order
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-preloader')
+
+        # Dictionary of level number -> future of the prepared level
+        self.pending = {}
+
+    def preload(self, level):
+        ''' Starts preparing a level in the background, if it is not already being prepared '''
+        if level not in self.pending:
+            self.pending[level] = self.executor.submit(self.prepare, level)
+
+    def take(self, level):
+        ''' Returns a prepared level, waiting for it if it is still being prepared '''
+        future = self.pending.pop(level, None)
+
+        # Prepare the level now if it was never preloaded
+        if future is None:
+            return self.prepare(level)
+
+        return future.result()
+
+
+def clear_cache():
+    ''' Forgets every decoded level '''
+    _level_cache.clear()
+
+
+def main():
+    ''' Compiles every map, or the maps given on the command line '''
+    map_names = sys.argv[1:] or sorted(glob.glob(LEVEL_FILE.replace('{}', '*')))
+    for map_name in map_names:
+        print('Compiled {} -> {}'.format(map_name, compile_level(map_name)))
+
+
+if __name__ == '__main__': # If the file is being run directly and not imported:
+    # Compile the levels
+    main()
@@ -0,0 +1,128 @@
+''' Rolling timings of each section of the game loop '''
+
+# Import standard python libraries
+import csv
+import json
+import math
+import time
+from collections import deque
+
+# Number of most recent samples each section's statistics are worked out over
+ROLLING_WINDOW = 600
+
+# Percentiles reported for each section
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_samples, percent):
+    ''' Returns the nearest-rank percentile of a sorted list of samples '''
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+class Section:
+    ''' Times each pass through a section of code, when used in a with statement '''
+
+    def __init__(self, window):
+        ''' Run when a section is first timed '''
+        # Most recent durations in seconds
+        self.samples = deque(maxlen=window)
+
+        # Number of passes timed since the game started
+        self.count = 0
+
+        # Time the current pass started
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.samples.append(time.perf_counter() - self.start)
+        self.count += 1
+
+
+class FrameProfiler:
+    ''' Collects rolling timings of named sections of the game loop '''
+
+    # Profiling is on, so the game may show the overlay
+    enabled = True
+
+    def __init__(self, window=ROLLING_WINDOW):
+        ''' Run when profiling is started '''
+        # Number of samples kept for each section
+        self.window = window
+
+        # Dictionary of section name -> Section, in the order they were first timed
+        self.sections = {}
+
+    def section(self, name):
+        ''' Returns the timer of a named section '''
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = Section(self.window)
+        return section
+
+    def stats(self):
+        ''' Returns the count, mean and percentiles in milliseconds of every section '''
+        rows = []
+        for name, section in self.sections.items():
+            samples = sorted(section.samples)
+            row = {'section': name,
+                   'count': section.count,
+                   'mean_ms': 1000 * sum(samples) / len(samples) if samples else 0.0}
+            for percent in PERCENTILES:
+                row['p{}_ms'.format(percent)] = 1000 * percentile(samples, percent)
+            rows.append(row)
+        return rows
+
+    def report(self):
+        ''' Returns the statistics as lines of text, one per section '''
+        lines = []
+        for row in self.stats():
+            lines.append('{:<20} '.format(row['section'])
+                         + ' '.join('p{}: {:6.3f}'.format(percent, row['p{}_ms'.format(percent)])
+                                    for percent in PERCENTILES))
+        return lines
+
+    def dump(self, file_name):
+        ''' Writes the statistics to a file, as JSON if it ends in .json and CSV otherwise '''
+        rows = self.stats()
+        with open(file_name, 'w', newline='') as output_file:
+            if file_name.endswith('.json'):
+                json.dump(rows, output_file, indent=2)
+            else:
+                fields = ['section', 'count', 'mean_ms'] + ['p{}_ms'.format(percent)
+                                                           for percent in PERCENTILES]
+                writer = csv.DictWriter(output_file, fields)
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+class NullSection:
+    ''' Stands in for a Section when profiling is off, timing nothing '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        pass
+
+
+class NullProfiler:
+    ''' Stands in for a FrameProfiler when profiling is off '''
+
+    # Profiling is off, so there is nothing to show
+    enabled = False
+
+    def section(self, name):
+        ''' Returns a section that times nothing '''
+        return NULL_SECTION
+
+
+# Shared do-nothing section and profiler, used when profiling is off
+NULL_SECTION = NullSection()
+NULL_PROFILER = NullProfiler()
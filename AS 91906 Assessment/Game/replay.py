@@ -0,0 +1,106 @@
+''' Recording of a run's input and frame times, so it can be replayed exactly '''
+
+# Import standard python libraries
+import json
+
+# Format version written at the start of every replay
+REPLAY_VERSION = 2
+
+# Older format versions that can still be read
+# Version 1 has no physics rate, as it ran one physics step per update
+READABLE_VERSIONS = (1, 2)
+
+
+class Recorder:
+    ''' Writes the key events and frame times of a run to a replay file as it is played '''
+
+    def __init__(self, file_name, level, engine, physics_rate=None):
+        ''' Run when a recording is started, before the first update of the level
+
+        If a physics rate is given, each update is a frame stepping the physics at that rate,
+        otherwise each update is one physics step.
+        '''
+        # File the replay is streamed to, so a crash still leaves the input recorded so far
+        self.replay_file = open(file_name, 'w')
+
+        # Number of game updates recorded so far
+        self.tick = 0
+
+        # The replay starts with everything needed to set up the same game world
+        self.write({'version': REPLAY_VERSION, 'level': level, 'engine': engine,
+                    'physics_rate': physics_rate})
+
+    def write(self, record):
+        ''' Appends a record to the replay file as one line of JSON '''
+        if self.replay_file:
+            self.replay_file.write(json.dumps(record) + '\n')
+
+    def key_press(self, key):
+        ''' Records a key press, applied before the next update '''
+        self.write({'tick': self.tick, 'press': key})
+
+    def key_release(self, key):
+        ''' Records a key release, applied before the next update '''
+        self.write({'tick': self.tick, 'release': key})
+
+    def update(self, delta_time):
+        ''' Records the time step of an update '''
+        self.write({'tick': self.tick, 'delta_time': delta_time})
+        self.tick += 1
+
+    def finish(self, result):
+        ''' Records the results of the run and closes the replay file '''
+        self.write({'result': result})
+        self.close()
+
+    def close(self):
+        ''' Closes the replay file '''
+        if self.replay_file:
+            self.replay_file.close()
+            self.replay_file = None
+
+
+class Replay:
+    ''' A recorded run, read back from a replay file '''
+
+    def __init__(self, level, engine, events, delta_times, result, physics_rate=None):
+        ''' Run when a replay file is read '''
+        # Starting level and physics engine of the run
+        self.level = level
+        self.engine = engine
+
+        # Physics steps per second, or None if every update was one physics step
+        self.physics_rate = physics_rate
+
+        # Key events, in the script format of simulate.py but with key codes
+        self.events = events
+
+        # Time step of every update, in order
+        self.delta_times = delta_times
+
+        # Results recorded when the run ended, or None if it was cut short
+        self.result = result
+
+
+def load_replay(file_name):
+    ''' Reads a replay file, raising ValueError if it is not a replay this version understands '''
+    with open(file_name) as replay_file:
+        records = [json.loads(line) for line in replay_file if line.strip()]
+
+    if not records or records[0].get('version') not in READABLE_VERSIONS:
+        raise ValueError('{} is not a version {} replay'.format(file_name, REPLAY_VERSION))
+
+    header = records[0]
+    events = []
+    delta_times = []
+    result = None
+    for record in records[1:]:
+        if 'delta_time' in record:
+            delta_times.append(record['delta_time'])
+        elif 'result' in record:
+            result = record['result']
+        else:
+            events.append(record)
+
+    return Replay(header['level'], header['engine'], events, delta_times, result,
+                  header.get('physics_rate'))
@@ -0,0 +1,264 @@
+''' Headless fixed-timestep simulation of the Platformer game '''
+
+# Import standard python libraries
+import argparse
+import json
+import time
+
+# Run pyglet without a window or display, so no GPU is needed
+import pyglet
+pyglet.options['headless'] = True
+
+# Import arcade python library and the game itself
+import arcade
+import Platformer
+import profiler
+import replay
+
+# Fixed time step of one simulated tick, in seconds
+TICK_DELTA_TIME = 1 / 60
+
+# Number of ticks in a 10 minute playthrough at the fixed time step
+DEFAULT_TICKS = 36000
+
+# Ticks between each jump of the default input script
+DEFAULT_JUMP_INTERVAL = 60
+
+# Ticks the jump key is held for in the default input script
+DEFAULT_JUMP_HOLD = 20
+
+
+def default_script(ticks):
+    ''' Builds an input script that runs right and jumps at regular intervals '''
+    events = [{'tick': 0, 'press': 'RIGHT'}]
+    for tick in range(DEFAULT_JUMP_INTERVAL, ticks, DEFAULT_JUMP_INTERVAL):
+        events.append({'tick': tick, 'press': 'UP'})
+        events.append({'tick': tick + DEFAULT_JUMP_HOLD, 'release': 'UP'})
+    return events
+
+
+def load_script(file_name):
+    ''' Reads an input script stored as one JSON event per line '''
+    with open(file_name) as script_file:
+        return [json.loads(line) for line in script_file if line.strip()]
+
+
+def key_code(key):
+    ''' Returns the key code of a script key, given either by name or by code '''
+    if isinstance(key, str):
+        return getattr(arcade.key, key)
+    return key
+
+
+def apply_event(world, event, recorder=None):
+    ''' Presses or releases the key named by a script event '''
+    if 'press' in event:
+        key = key_code(event['press'])
+        if recorder:
+            recorder.key_press(key)
+        world.key_press(key)
+    if 'release' in event:
+        key = key_code(event['release'])
+        if recorder:
+            recorder.key_release(key)
+        world.key_release(key)
+
+
+def player_state(world):
+    ''' Returns the state compared between runs: player position and velocity, level and results '''
+    player = world.player_sprite
+    return (world.level, player.center_x, player.center_y, player.change_x, player.change_y,
+            world.gems, world.lives)
+
+
+def run(world, events, ticks, delta_time=TICK_DELTA_TIME, trace=None,
+        delta_times=None, recorder=None, frames=False):
+    ''' Steps the game world for a number of ticks, feeding it the scripted input
+
+    If a trace list is given, the player state after every tick is appended to it.
+    If a list of delta_times is given, each tick uses its own time step instead.
+    If a replay recorder is given, the run is recorded to it.
+    If frames is true, each tick is a drawn frame stepping the physics at the world's
+    fixed rate, instead of one physics step.
+    '''
+    # Sort events so they can be consumed in tick order
+    events = sorted(events, key=lambda event: event['tick'])
+    next_event = 0
+
+    outcome = None
+    tick = 0
+    while tick < ticks:
+        # Apply every event scheduled for this tick
+        while next_event < len(events) and events[next_event]['tick'] <= tick:
+            apply_event(world, events[next_event], recorder)
+            next_event += 1
+
+        # Step the game logic by the tick's time step
+        if delta_times is not None:
+            delta_time = delta_times[tick]
+        if recorder:
+            recorder.update(delta_time)
+        if frames:
+            outcome = world.advance(delta_time)
+        else:
+            outcome = world.update(delta_time)
+        tick += 1
+        if trace is not None:
+            trace.append(player_state(world))
+
+        # Stop once the game over or death screen would be shown
+        if outcome:
+            break
+
+    return tick, outcome
+
+
+def new_world(level, engine, physics_rate=Platformer.PHYSICS_RATE):
+    ''' Creates a game world on a level, using the given physics engine and rate '''
+    world = Platformer.GameWorld()
+    world.physics_engine_type = engine
+    world.physics_rate = physics_rate
+    world.level = level
+    world.setup(world.level)
+    return world
+
+
+def compare_engines(level, events, ticks, delta_times=None, physics_rate=None):
+    ''' Runs the same input through both physics engines, returning the first tick they differ
+
+    If a physics rate is given, each tick is a drawn frame as in run(), otherwise one physics step.
+    '''
+    traces = {}
+    for engine in ('arcade', 'grid'):
+        traces[engine] = []
+        world = new_world(level, engine, physics_rate or Platformer.TUNED_PHYSICS_RATE)
+        run(world, events, ticks, trace=traces[engine], delta_times=delta_times,
+            frames=physics_rate is not None)
+
+    for tick, (expected, actual) in enumerate(zip(traces['arcade'], traces['grid'])):
+        if expected != actual:
+            return tick, expected, actual
+    if len(traces['arcade']) != len(traces['grid']):
+        return min(len(traces['arcade']), len(traces['grid'])), None, None
+    return None
+
+
+def compare_replay(file_name):
+    ''' Plays a recorded run's input through both physics engines, returning the first tick they differ '''
+    recording = replay.load_replay(file_name)
+    return compare_engines(recording.level, recording.events, len(recording.delta_times),
+                           recording.delta_times, recording.physics_rate)
+
+
+def play_replay(file_name):
+    ''' Replays a recorded run, returning its results and the results it was recorded with '''
+    recording = replay.load_replay(file_name)
+    world = new_world(recording.level, recording.engine,
+                      recording.physics_rate or Platformer.TUNED_PHYSICS_RATE)
+    _, outcome = run(world, recording.events, len(recording.delta_times),
+                     delta_times=recording.delta_times, frames=recording.physics_rate is not None)
+    return world.summary(outcome), recording.result
+
+
+def main():
+    ''' Main method '''
+    parser = argparse.ArgumentParser(description='Run the Platformer game logic without a window.')
+    parser.add_argument('--level', type=int, default=1, help='level to start on')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS, help='maximum ticks to simulate')
+    parser.add_argument('--script', help='JSON-lines input script, defaults to running right and jumping')
+    parser.add_argument('--engine', choices=('grid', 'arcade'), default=Platformer.PHYSICS_ENGINE,
+                        help='physics engine to simulate with')
+    parser.add_argument('--compare', action='store_true',
+                        help='check both physics engines produce the same trajectory, '
+                             'for the input script or for each --replay file')
+    parser.add_argument('--replay', nargs='+',
+                        help='replay files to play back and check against their results, '
+                             'or with --compare to check both physics engines against')
+    parser.add_argument('--record', help='file to record the simulated run to as a replay')
+    parser.add_argument('--profile', help='file to write update timings to, as .csv or .json')
+    parser.add_argument('--frame-rate', type=int,
+                        help='simulate frames drawn at this rate, stepping the physics at its own rate')
+    parser.add_argument('--physics-rate', type=int, default=Platformer.PHYSICS_RATE,
+                        help='physics steps per second when simulating frames')
+    args = parser.parse_args()
+
+    if args.replay and args.compare:
+        # Check both physics engines follow the same trajectory through every recorded run
+        differences = 0
+        for file_name in args.replay:
+            difference = compare_replay(file_name)
+            if difference is None:
+                print('{}: physics engines match'.format(file_name))
+            else:
+                print('{}: physics engines differ at tick {}: arcade {} | grid {}'.format(file_name,
+                                                                                          *difference))
+                differences += 1
+        if differences:
+            raise SystemExit(1)
+        return
+
+    if args.replay:
+        differences = 0
+        for file_name in args.replay:
+            start_time = time.perf_counter()
+            result, expected = play_replay(file_name)
+            elapsed = time.perf_counter() - start_time
+            print('{}: replayed in {:.3f}s: {}'.format(file_name, elapsed, result))
+            if expected is not None and result != expected:
+                print('Replay differs from its recording: {}'.format(expected))
+                differences += 1
+        if differences:
+            raise SystemExit(1)
+        return
+
+    if args.script:
+        events = load_script(args.script)
+    else:
+        events = default_script(args.ticks)
+
+    if args.compare:
+        difference = compare_engines(args.level, events, args.ticks)
+        if difference is None:
+            print('Physics engines match')
+        else:
+            print('Physics engines differ at tick {}: arcade {} | grid {}'.format(*difference))
+            raise SystemExit(1)
+        return
+
+    # Set up the game world on the starting level
+    frames = args.frame_rate is not None
+    physics_rate = args.physics_rate if frames else Platformer.TUNED_PHYSICS_RATE
+    delta_time = 1 / args.frame_rate if frames else TICK_DELTA_TIME
+    recorder = None
+    if args.record:
+        recorder = replay.Recorder(args.record, args.level, args.engine,
+                                   physics_rate if frames else None)
+    world = new_world(args.level, args.engine, physics_rate)
+    if args.profile:
+        world.profiler = profiler.FrameProfiler()
+
+    # Run the simulation and time it
+    start_time = time.perf_counter()
+    ticks, outcome = run(world, events, args.ticks, delta_time, recorder=recorder, frames=frames)
+    elapsed = time.perf_counter() - start_time
+
+    if recorder:
+        recorder.finish(world.summary(outcome))
+
+    world.update_clock()
+    print('Ticks: {} | Elapsed: {:.3f}s | Ticks/sec: {:.0f}'.format(ticks, elapsed, ticks / elapsed))
+    print('Outcome: {} | Level: {} | Gems: {} | Lives: {} | Time: {:02d}:{:02d}'.format(outcome,
+                                                                                     world.level,
+                                                                                     world.gems,
+                                                                                     world.lives,
+                                                                                     world.minutes,
+                                                                                     world.seconds))
+
+    if args.profile:
+        print('\n'.join(['Section (ms)'] + world.profiler.report()))
+        world.profiler.dump(args.profile)
+
+
+if __name__ == '__main__': # If the file is being run directly and not imported:
+    # Run the program
+    main()
@@ -0,0 +1,345 @@
+''' Tile sprites indexed by grid cell, for collision queries that do not scan whole layers '''
+
+# Import standard python libraries
+import math
+import weakref
+
+# Import arcade python library
+import arcade
+
+# Distance in pixels that a hit box must clearly overlap or clear a tile by for the quick
+# collision test to decide, far beyond any rounding in arcade's polygon check
+COLLISION_MARGIN = 1e-4
+
+# Number of collision results each grid remembers before it starts over
+COLLISION_CACHE_SIZE = 4096
+
+# Dictionary of sprite -> (hit box points, scale, HitBoxShape or None) the shape was built from
+_shapes = weakref.WeakKeyDictionary()
+
+
+class HitBoxShape:
+    ''' A sprite's hit box relative to its centre, for quick collision tests against tile rectangles
+
+    Its edges that run straight across or up are covered by comparing bounding rectangles,
+    so only the slanted edges' normals, and the hit box's own span along each, are kept.
+    '''
+
+    def __init__(self, points, scale):
+        ''' Run when a sprite's hit box is first tested, with its points and scale '''
+        # Scale the points the same way as arcade
+        if scale != 1:
+            points = [(x * scale, y * scale) for x, y in points]
+
+        # Edges of the hit box's bounding rectangle
+        self.left = min(x for x, y in points)
+        self.right = max(x for x, y in points)
+        self.bottom = min(y for x, y in points)
+        self.top = max(y for x, y in points)
+
+        # Hit boxes thinner than the margin could never be told apart from touching
+        self.supported = (self.right - self.left > COLLISION_MARGIN
+                          and self.top - self.bottom > COLLISION_MARGIN)
+
+        # List of (normal x, normal y, their sizes, and the hit box's lowest and highest
+        # projection onto the normal, each widened and narrowed by the margin) for every
+        # slanted edge. A zero-length edge makes arcade's check always fail, so such hit
+        # boxes are left to arcade.
+        self.slants = []
+        for index, (x1, y1) in enumerate(points):
+            x2, y2 = points[(index + 1) % len(points)]
+            normal_x = y2 - y1
+            normal_y = x1 - x2
+            if not normal_x and not normal_y:
+                self.supported = False
+            elif normal_x and normal_y:
+                projected = [normal_x * x + normal_y * y for x, y in points]
+                margin = COLLISION_MARGIN * math.hypot(normal_x, normal_y)
+                self.slants.append((normal_x, normal_y, abs(normal_x), abs(normal_y),
+                                    min(projected) - margin, min(projected) + margin,
+                                    max(projected) - margin, max(projected) + margin))
+
+
+def hit_box_shape(sprite):
+    ''' Returns the HitBoxShape of a sprite, or None if it is rotated or not supported '''
+    if sprite.angle:
+        return None
+
+    points = sprite.hit_box
+    scale = sprite.scale
+    cached = _shapes.get(sprite)
+    if cached is None or cached[0] is not points or cached[1] != scale:
+        shape = HitBoxShape(points, scale)
+        cached = _shapes[sprite] = (points, scale, shape if shape.supported else None)
+    return cached[2]
+
+
+def tile_rectangle(sprite):
+    ''' Returns the details of a tile's hit box that quick_collision() needs, or None if it is not an upright rectangle
+
+    These are the (left, right, bottom, top) edges, the sprite's position and collision
+    radius, and the centre and half the width and height of the rectangle.
+    '''
+    points = sprite.get_adjusted_hit_box()
+    if len(points) != 4:
+        return None
+    for index, (x1, y1) in enumerate(points):
+        x2, y2 = points[(index + 1) % 4]
+        # Every edge must run either straight across or straight up, and not be zero length
+        if (x1 == x2) == (y1 == y2):
+            return None
+
+    left, right, bottom, top = hit_box_bounds(sprite)
+    if right - left <= COLLISION_MARGIN or top - bottom <= COLLISION_MARGIN:
+        return None
+    return (left, right, bottom, top, sprite.center_x, sprite.center_y, sprite.collision_radius,
+            (left + right) / 2, (bottom + top) / 2, (right - left) / 2, (top - bottom) / 2)
+
+
+def quick_collision(shape, x, y, radius, tile):
+    ''' Returns whether a hit box at (x, y) collides with a tile rectangle, or None if it is too close to call
+
+    The answer is the one arcade.check_for_collision() gives. Rectangles that do not overlap are
+    apart along the tile's own edge normals, where arcade's projections keep the order of the
+    coordinates exactly. Anything else is only decided when every normal shows a gap or an
+    overlap well beyond rounding, otherwise arcade has to check it.
+    '''
+    left, right, bottom, top, tile_x, tile_y, tile_radius, centre_x, centre_y, half_width, half_height = tile
+
+    # arcade's pre-check of the sprites' collision radii, with the same arithmetic
+    radius_sum = radius + tile_radius
+    limit = radius_sum * radius_sum
+    diff_x = x - tile_x
+    diff_x2 = diff_x * diff_x
+    if diff_x2 > limit:
+        return False
+    diff_y = y - tile_y
+    diff_y2 = diff_y * diff_y
+    if diff_y2 > limit or diff_x2 + diff_y2 > limit:
+        return False
+
+    # Edges of the hit box, which are exactly where arcade puts them
+    box_left = shape.left + x
+    box_right = shape.right + x
+    box_bottom = shape.bottom + y
+    box_top = shape.top + y
+    if box_right <= left or right <= box_left or box_top <= bottom or top <= box_bottom:
+        return False
+
+    # Both are wider and taller than the margin, so only an overlap at one edge can be thin
+    close_call = (box_right - left < COLLISION_MARGIN or right - box_left < COLLISION_MARGIN
+                  or box_top - bottom < COLLISION_MARGIN or top - box_bottom < COLLISION_MARGIN)
+
+    # Project the tile, relative to the hit box's centre, onto each slanted edge's normal
+    centre_x -= x
+    centre_y -= y
+    for normal_x, normal_y, size_x, size_y, low_far, low_near, high_near, high_far in shape.slants:
+        centre = normal_x * centre_x + normal_y * centre_y
+        half = size_x * half_width + size_y * half_height
+        if centre - half >= high_far or centre + half <= low_far:
+            return False
+        if centre - half > high_near or centre + half < low_near:
+            close_call = True
+
+    return None if close_call else True
+
+
+def check_at(sprite, position, other):
+    ''' Returns arcade's check of whether two sprites collide, with the first moved to a position while checking '''
+    original = sprite.position
+    if position == original:
+        return arcade.check_for_collision(sprite, other)
+
+    sprite.position = position
+    hit = arcade.check_for_collision(sprite, other)
+    sprite.position = original
+    return hit
+
+
+def hit_box_bounds(sprite, shape=None, position=None):
+    ''' Returns the (left, right, bottom, top) edges of a sprite's hit box, from its HitBoxShape if given one '''
+    # Offsetting the shape's edges rounds the same way as offsetting every point
+    if shape is not None:
+        x, y = position or sprite.position
+        return shape.left + x, shape.right + x, shape.bottom + y, shape.top + y
+
+    # Other hit boxes are only known where the sprite is, so move it there while measuring
+    if position is not None and position != sprite.position:
+        original = sprite.position
+        sprite.position = position
+        bounds = hit_box_bounds(sprite)
+        sprite.position = original
+        return bounds
+
+    points = sprite.get_adjusted_hit_box()
+    x_points = [point[0] for point in points]
+    y_points = [point[1] for point in points]
+    return min(x_points), max(x_points), min(y_points), max(y_points)
+
+
+def bounds_touch(bounds, other):
+    ''' Returns True if two (left, right, bottom, top) rectangles overlap or touch '''
+    return (bounds[0] <= other[1] and other[0] <= bounds[1]
+            and bounds[2] <= other[3] and other[2] <= bounds[3])
+
+
+class TileGrid:
+    ''' A layer's sprites bucketed into the map's grid cells '''
+
+    def __init__(self, sprite_list, cell_width, cell_height=None):
+        ''' Run when a layer is indexed '''
+        # Size of each grid cell in pixels
+        self.cell_width = cell_width
+        self.cell_height = cell_height or cell_width
+
+        # Dictionary of (column, row) -> list of sprites whose hit box lies in that cell
+        self.cells = {}
+
+        # Dictionary of sprite -> cells the sprite is stored in
+        self.sprite_cells = {}
+
+        # Dictionary of sprite -> edges of the sprite's hit box when it was stored
+        self.sprite_bounds = {}
+
+        # Dictionary of sprite -> details from tile_rectangle() of sprites whose
+        # hit box is an upright rectangle, for the quick collision test
+        self.sprite_rectangles = {}
+
+        # Dictionary of (first column, last column, first row, last row) -> tuple of the
+        # sprites in those cells, emptied whenever a sprite is added or removed
+        self.area_cache = {}
+
+        # Dictionary of (HitBoxShape, x, y, collision radius) -> tuple of the sprites a hit box
+        # there touches, emptied whenever a sprite is added or removed
+        self.collision_cache = {}
+
+        for sprite in sprite_list:
+            self.add(sprite)
+
+    def add(self, sprite):
+        ''' Stores a sprite in every cell its hit box covers '''
+        self.area_cache.clear()
+        self.collision_cache.clear()
+        left, right, bottom, top = self.sprite_bounds[sprite] = hit_box_bounds(sprite)
+        rectangle = tile_rectangle(sprite)
+        if rectangle is not None:
+            self.sprite_rectangles[sprite] = rectangle
+
+        # Cells are half-open, so a tile exactly filling one cell is stored only once
+        first_column = math.floor(left / self.cell_width)
+        last_column = max(math.ceil(right / self.cell_width) - 1, first_column)
+        first_row = math.floor(bottom / self.cell_height)
+        last_row = max(math.ceil(top / self.cell_height) - 1, first_row)
+
+        keys = []
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                self.cells.setdefault((column, row), []).append(sprite)
+                keys.append((column, row))
+        self.sprite_cells[sprite] = keys
+
+    def remove(self, sprite):
+        ''' Removes a sprite from every cell it is stored in '''
+        self.area_cache.clear()
+        self.collision_cache.clear()
+        for key in self.sprite_cells.pop(sprite, ()):
+            self.cells[key].remove(sprite)
+        self.sprite_bounds.pop(sprite, None)
+        self.sprite_rectangles.pop(sprite, None)
+
+    def sprites_in_area(self, left, right, bottom, top):
+        ''' Returns a tuple of the sprites stored in any cell touching a rectangle of the map '''
+        # Start one cell early when the edge sits on a cell boundary, as touching counts as a hit
+        first_column = math.ceil(left / self.cell_width) - 1
+        last_column = math.floor(right / self.cell_width)
+        first_row = math.ceil(bottom / self.cell_height) - 1
+        last_row = math.floor(top / self.cell_height)
+
+        # The player keeps checking the same few cells, so each area is only gathered once
+        key = (first_column, last_column, first_row, last_row)
+        found = self.area_cache.get(key)
+        if found is not None:
+            return found
+
+        # Dictionary keys keep the order sprites were found in, storing each only once
+        cells = self.cells
+        found = {}
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = cells.get((column, row))
+                if cell:
+                    found.update(dict.fromkeys(cell))
+        found = self.area_cache[key] = tuple(found)
+        return found
+
+    def touching(self, sprite, candidates, shape=None, position=None):
+        ''' Returns the candidates whose hit box touches the given sprite's hit box
+
+        The sprite's HitBoxShape can be passed in when it is already known, and a
+        position to check the sprite at instead of where it is.
+        '''
+        if position is None:
+            position = sprite.position
+        if shape is None:
+            shape = hit_box_shape(sprite)
+        if shape is None:
+            # Only arcade can check hit boxes that are rotated or not supported
+            sprite_bounds = self.sprite_bounds
+            original = sprite.position
+            sprite.position = position
+            bounds = hit_box_bounds(sprite)
+            found = [candidate for candidate in candidates
+                     if bounds_touch(bounds, sprite_bounds[candidate])
+                     and arcade.check_for_collision(sprite, candidate)]
+            sprite.position = original
+            return found
+
+        x, y = position
+        radius = sprite.collision_radius
+        left = shape.left + x
+        right = shape.right + x
+        bottom = shape.bottom + y
+        top = shape.top + y
+
+        found = []
+        sprite_bounds = self.sprite_bounds
+        sprite_rectangles = self.sprite_rectangles
+        for candidate in candidates:
+            # A hit box lies inside its bounding rectangle, so rectangles that do not
+            # touch rule out a collision without the more costly polygon check
+            other = sprite_bounds[candidate]
+            if left > other[1] or other[0] > right or bottom > other[3] or other[2] > top:
+                continue
+
+            # Upright tiles are tested quickly, leaving arcade only the close calls
+            rectangle = sprite_rectangles.get(candidate)
+            hit = None if rectangle is None else quick_collision(shape, x, y, radius, rectangle)
+            if hit is None:
+                hit = check_at(sprite, position, candidate)
+            if hit:
+                found.append(candidate)
+        return found
+
+    def collisions(self, sprite, shape=None, position=None):
+        ''' Returns the stored sprites whose hit box touches the given sprite's hit box, checked at a position if given one
+
+        Results are remembered for each hit box and position, as the player spends
+        much of its time standing still or pushing against the same wall.
+        '''
+        if shape is None:
+            shape = hit_box_shape(sprite)
+        if shape is None:
+            candidates = self.sprites_in_area(*hit_box_bounds(sprite, shape, position))
+            return self.touching(sprite, candidates, shape, position) if candidates else []
+
+        x, y = position or sprite.position
+        key = (shape, x, y, sprite.collision_radius)
+        found = self.collision_cache.get(key)
+        if found is None:
+            # Polygon checks only for the few sprites sharing a cell with the given sprite
+            candidates = self.sprites_in_area(shape.left + x, shape.right + x, shape.bottom + y, shape.top + y)
+            found = tuple(self.touching(sprite, candidates, shape, (x, y))) if candidates else ()
+            if len(self.collision_cache) >= COLLISION_CACHE_SIZE:
+                self.collision_cache.clear()
+            self.collision_cache[key] = found
+        return list(found)
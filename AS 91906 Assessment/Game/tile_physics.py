@@ -0,0 +1,223 @@
+''' Platformer physics resolved against grid-indexed tile layers '''
+
+# Import standard python libraries
+import math
+
+# Import the game's tile grid index
+import tile_grid
+
+# Distance below the player checked for a floor to jump from, as in arcade
+JUMP_CHECK_DISTANCE = 5
+
+
+class TilePhysicsEngine:
+    ''' Alternative to arcade.PhysicsEnginePlatformer for maps whose platforms never move
+
+    Movement is resolved with the same steps as arcade's engine, so trajectories match,
+    but collisions are only tested against the tiles in the grid cells the player covers,
+    each move is worked out on its position before the sprite itself is moved, and whether
+    the player is grounded or on a ladder is worked out once per position.
+    '''
+
+    def __init__(self, player_sprite, platforms, gravity_constant=0.5, ladders=None):
+        ''' Run when the physics engine is created, with TileGrids of platforms and ladders '''
+        # The moving sprite and the grids it collides with
+        self.player_sprite = player_sprite
+        self.platforms = platforms
+        self.ladders = ladders
+
+        # Downward acceleration per step
+        self.gravity_constant = gravity_constant
+
+        # Only single jumps are supported, but the counter is kept for compatibility
+        self.jumps_since_ground = 0
+
+        # Player position that the cached contact state was worked out at
+        self.state_position = None
+
+        # Cached contact state of the player
+        self.grounded = False
+        self.on_ladder = False
+
+        # Shape of the player's hit box during the current move, for quick collision tests
+        self.shape = None
+
+    def update_state(self):
+        ''' Works out whether the player is grounded or on a ladder, if it has moved since last time '''
+        player = self.player_sprite
+        if player.position == self.state_position:
+            return
+
+        # Check for ladders at the player's position
+        shape = tile_grid.hit_box_shape(player)
+        self.on_ladder = bool(self.ladders and self.ladders.collisions(player, shape))
+
+        # Check for a floor just below the player
+        self.grounded = self.floor_below(JUMP_CHECK_DISTANCE, shape)
+
+        # Stored afterwards, as moving down and back up can round the position
+        self.state_position = player.position
+
+    def floor_below(self, y_distance, shape=None):
+        ''' Returns True if there is a platform within a distance below the player, the same way arcade checks '''
+        player = self.player_sprite
+        x, y = player.position
+        below = y - y_distance
+        grounded = bool(self.platforms.collisions(player, shape, (x, below)))
+
+        # arcade moves the player down and back up, which can round its position
+        player.center_y = below + y_distance
+        if grounded:
+            self.jumps_since_ground = 0
+        return grounded
+
+    def is_on_ladder(self):
+        ''' Return 'true' if the player is in contact with a ladder. '''
+        self.update_state()
+        return self.on_ladder
+
+    def can_jump(self, y_distance=JUMP_CHECK_DISTANCE):
+        ''' Returns True if there is a platform below the player '''
+        # Only the default distance is cached, so other distances are checked every time
+        if y_distance != JUMP_CHECK_DISTANCE:
+            return self.floor_below(y_distance)
+        self.update_state()
+        return self.grounded
+
+    def jump(self, velocity):
+        ''' Have the character jump. '''
+        self.player_sprite.change_y = velocity
+
+    def hits(self, x, y):
+        ''' Returns the candidate tiles the player would collide with at a position '''
+        return self.platforms.collisions(self.player_sprite, self.shape, (x, y))
+
+    def escape(self):
+        ''' Moves the player out of any platform it starts inside, the same way arcade does '''
+        player = self.player_sprite
+        original_x = player.center_x
+        original_y = player.center_y
+
+        vary = 1
+        while True:
+            try_list = [[original_x, original_y + vary],
+                        [original_x, original_y - vary],
+                        [original_x + vary, original_y],
+                        [original_x - vary, original_y],
+                        [original_x + vary, original_y + vary],
+                        [original_x + vary, original_y - vary],
+                        [original_x - vary, original_y + vary],
+                        [original_x - vary, original_y - vary]
+                        ]
+
+            for x, y in try_list:
+                player.center_x = x
+                player.center_y = y
+                if not self.platforms.collisions(player):
+                    return
+            vary *= 2
+
+    def move(self):
+        ''' Moves the player by its change in x and y, resolving collisions with platforms '''
+        player = self.player_sprite
+        self.shape = tile_grid.hit_box_shape(player)
+
+        # See if we are starting this step already inside a platform
+        if self.platforms.collisions(player, self.shape):
+            self.escape()
+
+        # The move is worked out on the position alone, and the player only moved once it is resolved
+        original_x, original_y = player.position
+        x = original_x
+        y = original_y
+
+        # --- Move in the y direction
+        y += player.change_y
+
+        # Check for platform hit
+        complete_hit_list = self.hits(x, y)
+
+        # If we hit a platform, move so the edges are at the same point
+        if complete_hit_list:
+            if player.change_y > 0:
+                while self.hits(x, y):
+                    y -= 1
+            elif player.change_y < 0:
+                for item in complete_hit_list:
+                    while self.platforms.touching(player, [item], self.shape, (x, y)):
+                        y += 0.25
+            player.change_y = min(0.0, complete_hit_list[0].change_y)
+
+        y = round(y, 2)
+
+        # --- Move in the x direction, searching for the furthest clear position
+        if player.change_x:
+            # Keep track of our current y, used in ramping up
+            almost_original_y = y
+
+            # Strip off sign so only one version is needed for both directions
+            direction = math.copysign(1, player.change_x)
+            cur_x_change = abs(player.change_x)
+            upper_bound = cur_x_change
+            lower_bound = 0
+            cur_y_change = 0
+
+            exit_loop = False
+            while not exit_loop:
+                # Move sprite and check for collision
+                x = original_x + cur_x_change * direction
+                collision_check = self.hits(x, y)
+                for sprite in collision_check:
+                    if sprite not in complete_hit_list:
+                        complete_hit_list.append(sprite)
+
+                # Did we collide?
+                if collision_check:
+                    # We collided, so try to move up a ramp
+                    cur_y_change = cur_x_change
+                    y = original_y + cur_y_change
+
+                    collision_check = self.hits(x, y)
+                    if collision_check:
+                        cur_y_change -= cur_x_change
+                    else:
+                        while not collision_check and cur_y_change > 0:
+                            cur_y_change -= 1
+                            y = almost_original_y + cur_y_change
+                            collision_check = self.hits(x, y)
+                        cur_y_change += 1
+                        collision_check = []
+
+                    if collision_check:
+                        # Still blocked, so search closer to where we started
+                        upper_bound = cur_x_change - 1
+                        if upper_bound - lower_bound <= 1:
+                            cur_x_change = lower_bound
+                            exit_loop = True
+                        else:
+                            cur_x_change = (upper_bound + lower_bound) / 2
+                    else:
+                        exit_loop = True
+
+                else:
+                    # No collision, so search further from where we started
+                    lower_bound = cur_x_change
+                    if upper_bound - lower_bound <= 1:
+                        exit_loop = True
+                    else:
+                        cur_x_change = (upper_bound + lower_bound) / 2
+
+            x = original_x + cur_x_change * direction
+            y = almost_original_y + cur_y_change
+
+        player.position = (x, y)
+
+        return complete_hit_list
+
+    def update(self):
+        ''' Move the player and resolve collisions, returning the platforms it touched '''
+        # Apply gravity unless the player is on a ladder
+        if not self.is_on_ladder():
+            self.player_sprite.change_y -= self.gravity_constant
+
+        return self.move()
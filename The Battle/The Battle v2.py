@@ -100,46 +100,47 @@ STRENGTH_MAXIMUM = 25
 INITIATIVE_MINIMUM = 1
 INITIATIVE_MAXIMUM = 10
 
-while True:
-	print("Welcome to The Battle!")
+if __name__ == "__main__":
+	while True:
+		print("Welcome to The Battle!")
 
-	playerName = ""
+		playerName = ""
 
-	while not playerName.isalpha():
-		playerName = input("\nWhat is your name?: ").capitalize()
+		while not playerName.isalpha():
+			playerName = input("\nWhat is your name?: ").capitalize()
 
-		if playerName.isalpha():
-			break
+			if playerName.isalpha():
+				break
 		
-		else:
-			print("\nYour name must only contain letters A-Z.")
+			else:
+				print("\nYour name must only contain letters A-Z.")
 
-	print("\nWhich weapon would you like to select?\n")
-	numbered_output(WEAPON_OPTIONS)
-	playerWeapon = WEAPON_OPTIONS[user_input(len(WEAPON_OPTIONS), "your choice") - INDEX_OFFSET]
+		print("\nWhich weapon would you like to select?\n")
+		numbered_output(WEAPON_OPTIONS)
+		playerWeapon = WEAPON_OPTIONS[user_input(len(WEAPON_OPTIONS), "your choice") - INDEX_OFFSET]
 
-	player = Hero(playerName, playerWeapon)
+		player = Hero(playerName, playerWeapon)
 
-	game = Enemy()
+		game = Enemy()
 
-	battle()
+		battle()
 
-	while game.alive == True and player.alive == True:
-		ATTACK_OPTIONS = ("Attack again", "No")
-		print("\nWould you like to attack again?\n")
-		numbered_output(ATTACK_OPTIONS)
-		attackInput = user_input(len(ATTACK_OPTIONS), "your choice")
+		while game.alive == True and player.alive == True:
+			ATTACK_OPTIONS = ("Attack again", "No")
+			print("\nWould you like to attack again?\n")
+			numbered_output(ATTACK_OPTIONS)
+			attackInput = user_input(len(ATTACK_OPTIONS), "your choice")
 
-		if ATTACK_OPTIONS[attackInput - INDEX_OFFSET] == "Attack again":
-			battle()
+			if ATTACK_OPTIONS[attackInput - INDEX_OFFSET] == "Attack again":
+				battle()
 
-		else:
-			break
+			else:
+				break
 
-	if game.alive == False:
-		print("\nCongratulations, {} has won the game!".format(player.name))
+		if game.alive == False:
+			print("\nCongratulations, {} has won the game!".format(player.name))
 
-	elif player.alive == False:
-		print("\nBetter luck next time, {} has been slain by {}.".format(player.name, game.enemy))
+		elif player.alive == False:
+			print("\nBetter luck next time, {} has been slain by {}.".format(player.name, game.enemy))
 
-	restart_or_exit()
\ No newline at end of file
+		restart_or_exit()
\ No newline at end of file
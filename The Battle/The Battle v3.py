@@ -1,4 +1,5 @@
-import sys, random
+import sys, random, battle_engine
+from battle_engine import ENEMY_OPTIONS, WEAPON_OPTIONS, RACE_OPTIONS, CHAR_CLASS_OPTIONS, INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM
 
 def user_input(rangeMaximum, promptWord):
 	inputValue = ""
@@ -57,11 +58,7 @@ def restart_or_exit():
 	print("")
 
 def battle():
-	game.initiative = random.randint(INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM)
-	player.initiative = random.randint(INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM)
-
-	while player.initiative == game.initiative:
-		player.initiative = random.randint(INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM)
+	player.initiative, game.initiative = battle_engine.roll_initiative(random)
 
 	if player.initiative > game.initiative:
 		game.health, game.alive = attack(player.name, player.weapon, player.strength, game.enemy, game.health)
@@ -76,30 +73,24 @@ def battle():
 			game.health, game.alive = attack(player.name, player.weapon, player.strength, game.enemy, game.health)
 
 def attack(attackerName, attackerWeapon, attackerStrength, opponentName, opponentHealth):
-	roundHit = random.randint(0, 1)
+	opponentHealth, opponentAlive, roundHit = battle_engine.attack(attackerStrength, opponentHealth, random)
 
-	if roundHit == 0:
+	if not roundHit:
 		print("\n{} has missed {} with their {}. They remain on {} HP.".format(attackerName.title(), opponentName, attackerWeapon, opponentHealth))
 
 	else:
-		opponentHealth -= attackerStrength
-
 		print("\n{} has landed a hit with their {}, {} is now on {} HP.".format(attackerName.title(), attackerWeapon, opponentName, opponentHealth))
 
-	if opponentHealth < 1:
+	if not opponentAlive:
 		print("\n{} has successfully slain {} with their {}.".format(attackerName.title(), opponentName, attackerWeapon))
 
-		return opponentHealth, False
-
-	else:
-		return opponentHealth, True
+	return opponentHealth, opponentAlive
 
 class Enemy:
 	def __init__(self):
 		self.enemy = random.choice(ENEMY_OPTIONS)
 		self.weapon = random.choice(WEAPON_OPTIONS)
-		self.health = random.randint(HEALTH_MINIMUM, HEALTH_MAXIMUM)
-		self.strength = random.randint(STRENGTH_MINIMUM, STRENGTH_MAXIMUM)
+		self.health, self.strength = battle_engine.enemy_stats(random)
 		self.initiative = random.randint(INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM)
 		self.alive = True
 
@@ -109,17 +100,11 @@ class Hero:
 		self.race = race
 		self.Character_class = charClass
 		self.weapon = weapon
-		self.health = random.randint(HEALTH_MINIMUM, HEALTH_MAXIMUM) - RACE_HEALTH[race]
-
-		if self.weapon == CHAR_CLASS_WEAPONS[self.Character_class]:
-			strengthModifier = WEAPON_MODIFIER[self.weapon]
+		self.health, self.strength = battle_engine.hero_stats(race, charClass, weapon, random)
+		strengthModifier = battle_engine.strength_modifier(self.Character_class, self.weapon)
 
+		if strengthModifier:
 			print("\n{}s are highly proficient with a {}, your strength has increased by {}.".format(self.Character_class, self.weapon, strengthModifier))
-
-		else:
-			strengthModifier = 0
-
-		self.strength = random.randint(STRENGTH_MINIMUM, STRENGTH_MAXIMUM) + strengthModifier
 		self.initiative = random.randint(INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM)
 		self.alive = True
 
@@ -128,77 +113,35 @@ RANGE_OFFSET = 1
 INDEX_OFFSET = 1
 INDEX_START = 0
 ENUMERATE_START = 1
-ENEMY_OPTIONS = ["the Roman", "the Parthian", "the Celt", "the Gaul", "the Spartan", "the Egyptian"]
-WEAPON_OPTIONS = ["Two Handed Sword" , "Dagger", "Holy Cross", "Short Sword", "Dart", "Fighting Shield", "Double Daggers", "Long Bow", "Magic Staff", "Wand"]
-RACE_OPTIONS = ["Human", "Dwarf", "Halfling", "Elf", "Gnome", "Half-Orc", "Half-Elf"]
-RACE_HEALTH = {
-	"Human": 0,
-	"Dwarf": 3,
-	"Halfling": -3,
-	"Elf": 2,
-	"Gnome": -3,
-	"Half-Orc": 5,
-	"Half-Elf": 2
-	}
-CHAR_CLASS_OPTIONS = ["Barbarian", "Bard", "Cleric", "Fighter", "Druid", "Paladin", "Rogue", "Ranger", "Sorcerer" , "Wizard"]
-CHAR_CLASS_WEAPONS = {
-	"Barbarian": "Two handed sword",
-	"Bard": "Dagger",
-	"Cleric": "Holy Cross",
-	"Fighter": "Short Sword",
-	"Druid": "Dart",
-	"Paladin": "Fighting Shield",
-	"Rogue": "Double Daggers",
-	"Ranger": "Long Bow",
-	"Sorcerer": "Magic Staff",
-	"Wizard": "Wand"
-}
-WEAPON_MODIFIER = {
-	"Two Handed Sword": 5,
-	"Dagger": 3,
-	"Holy Cross": 1,
-	"Short Sword": 1,
-	"Dart": 3,
-	"Fighting Shield": 4,
-	"Double Daggers": 4,
-	"Long Bow": 3,
-	"Magic Staff": 2,
-	"Wand": 5
-}
-HEALTH_MINIMUM = 50
-HEALTH_MAXIMUM = 100
-STRENGTH_MINIMUM = 10
-STRENGTH_MAXIMUM = 25
-INITIATIVE_MINIMUM = 1
-INITIATIVE_MAXIMUM = 10
-
-while True:
-	print("Welcome to The Battle!")
-
-	playerName, playerRace, playerCharClass, playerWeapon = player_information()
-
-	player = Hero(playerName, playerRace, playerCharClass, playerWeapon)
-
-	game = Enemy()
-
-	battle()
-
-	while game.alive == True and player.alive == True:
-		ATTACK_OPTIONS = ("Attack again", "No")
-		print("\nWould you like to attack again?\n")
-		numbered_output(ATTACK_OPTIONS)
-		attackInput = user_input(len(ATTACK_OPTIONS), "your choice")
-
-		if ATTACK_OPTIONS[attackInput - INDEX_OFFSET] == "Attack again":
-			battle()
 
-		else:
-			break
+if __name__ == "__main__":
+	while True:
+		print("Welcome to The Battle!")
+
+		playerName, playerRace, playerCharClass, playerWeapon = player_information()
+
+		player = Hero(playerName, playerRace, playerCharClass, playerWeapon)
+
+		game = Enemy()
+
+		battle()
+
+		while game.alive == True and player.alive == True:
+			ATTACK_OPTIONS = ("Attack again", "No")
+			print("\nWould you like to attack again?\n")
+			numbered_output(ATTACK_OPTIONS)
+			attackInput = user_input(len(ATTACK_OPTIONS), "your choice")
+
+			if ATTACK_OPTIONS[attackInput - INDEX_OFFSET] == "Attack again":
+				battle()
+
+			else:
+				break
 
-	if game.alive == False:
-		print("\nCongratulations, {} has won the game!".format(player.name))
+		if game.alive == False:
+			print("\nCongratulations, {} has won the game!".format(player.name))
 
-	elif player.alive == False:
-		print("\nBetter luck next time, {} has been slain by {}.".format(player.name, game.enemy))
+		elif player.alive == False:
+			print("\nBetter luck next time, {} has been slain by {}.".format(player.name, game.enemy))
 
-	restart_or_exit()
\ No newline at end of file
+		restart_or_exit()
\ No newline at end of file
@@ -60,27 +60,28 @@ INDEX_OFFSET = 1
 INDEX_START = 0
 ENUMERATE_START = 1
 
-while True:
-	print("Welcome to The Battle!")
+if __name__ == "__main__":
+	while True:
+		print("Welcome to The Battle!")
 
-	game = Enemy()
+		game = Enemy()
 
-	game.battle()
+		game.battle()
 
-	while game.alive == True:
-		ATTACK_OPTIONS = ("Attack again", "No")
-		print("\nWould you like to attack again?\n")
-		numbered_output(ATTACK_OPTIONS)
-		attackInput = user_input(len(ATTACK_OPTIONS), "your choice")
+		while game.alive == True:
+			ATTACK_OPTIONS = ("Attack again", "No")
+			print("\nWould you like to attack again?\n")
+			numbered_output(ATTACK_OPTIONS)
+			attackInput = user_input(len(ATTACK_OPTIONS), "your choice")
 
-		if ATTACK_OPTIONS[attackInput - INDEX_OFFSET] == "Attack again":
-			game.battle()
+			if ATTACK_OPTIONS[attackInput - INDEX_OFFSET] == "Attack again":
+				game.battle()
 
-		else:
-			print("\nStarting new game...")
+			else:
+				print("\nStarting new game...")
 
-			game = Enemy()
+				game = Enemy()
 
-	print("\nCongratulations, you have won the game!")
+		print("\nCongratulations, you have won the game!")
 
-	restart_or_exit()
\ No newline at end of file
+		restart_or_exit()
\ No newline at end of file
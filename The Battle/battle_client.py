@@ -0,0 +1,103 @@
+import argparse, asyncio, collections, json, random, time, battle_engine, battle_server
+
+class LoadStats:
+	def __init__(self):
+		self.sessions = 0
+		self.games = 0
+		self.wins = 0
+		self.requests = 0
+		self.errors = 0
+		self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+
+	def percentile(self, percent):
+		if not self.latencies:
+			return 0.0
+
+		ordered = sorted(self.latencies)
+
+		return ordered[min(len(ordered) - 1, int(percent / 100 * len(ordered)))]
+
+async def request(reader, writer, message, stats):
+	startTime = time.perf_counter()
+	writer.write(json.dumps(message).encode() + b"\n")
+	await writer.drain()
+	line = await reader.readline()
+	stats.latencies.append(time.perf_counter() - startTime)
+	stats.requests += 1
+
+	if not line:
+		raise ConnectionError("server closed the connection")
+
+	response = json.loads(line)
+
+	if "error" in response:
+		stats.errors += 1
+
+	return response
+
+async def play_session(host, port, games, builds, rng, stats, connectLimit):
+	async with connectLimit:
+		reader, writer = await asyncio.open_connection(host, port, limit=battle_server.MAX_LINE_LENGTH)
+
+	try:
+		welcome = json.loads(await reader.readline())
+
+		if "error" in welcome:
+			raise ConnectionError(welcome["error"])
+
+		stats.sessions += 1
+
+		for gameNumber in range(games):
+			race, charClass, weapon = rng.choice(builds)
+			response = await request(reader, writer, {"action": "new", "race": race, "class": charClass, "weapon": weapon}, stats)
+
+			while "error" not in response and not response.get("outcome"):
+				response = await request(reader, writer, {"action": "attack"}, stats)
+
+			stats.games += 1
+			stats.wins += response.get("outcome") == "won"
+
+		await request(reader, writer, {"action": "quit"}, stats)
+
+	finally:
+		writer.close()
+
+async def run_load(host, port, sessions, games, seed, connectRate):
+	builds = list(battle_engine.all_builds())
+	stats = LoadStats()
+	connectLimit = asyncio.Semaphore(connectRate)
+	tasks = [play_session(host, port, games, builds, random.Random("{} {}".format(seed, session)), stats, connectLimit) for session in range(sessions)]
+	failures = [result for result in await asyncio.gather(*tasks, return_exceptions=True) if isinstance(result, Exception)]
+
+	return stats, failures
+
+def main():
+	parser = argparse.ArgumentParser(description="Generate load against a Battle server with many concurrent sessions.")
+	parser.add_argument("--host", default=battle_server.DEFAULT_HOST, help="address of the server")
+	parser.add_argument("--port", type=int, default=battle_server.DEFAULT_PORT, help="port of the server")
+	parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS, help="concurrent sessions to open")
+	parser.add_argument("--games", type=int, default=DEFAULT_GAMES, help="games to play in each session")
+	parser.add_argument("--seed", type=int, default=0, help="seed the builds of every session are chosen from")
+	parser.add_argument("--connect-rate", type=int, default=DEFAULT_CONNECT_RATE, help="connections to open at once")
+	args = parser.parse_args()
+
+	startTime = time.perf_counter()
+	stats, failures = asyncio.run(run_load(args.host, args.port, args.sessions, args.games, args.seed, args.connect_rate))
+	elapsed = time.perf_counter() - startTime
+
+	print("Sessions: {} ({} failed) | Games: {} ({:.2f}% won) | Requests: {} ({} errors)".format(stats.sessions, len(failures), stats.games, stats.wins / stats.games * 100 if stats.games else 0, stats.requests, stats.errors))
+	print("Elapsed: {:.2f}s | {:.0f} games/sec | {:.0f} requests/sec".format(elapsed, stats.games / elapsed, stats.requests / elapsed))
+	print("Latency: " + " | ".join("P{} {:.2f}ms".format(percent, stats.percentile(percent) * 1000) for percent in LATENCY_PERCENTILES))
+
+	for failure in failures[:FAILURES_SHOWN]:
+		print("Failed session: {!r}".format(failure))
+
+DEFAULT_SESSIONS = 1000
+DEFAULT_GAMES = 10
+DEFAULT_CONNECT_RATE = 100
+LATENCY_SAMPLES = 100000
+LATENCY_PERCENTILES = (50, 95, 99)
+FAILURES_SHOWN = 5
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,176 @@
+def strength_modifier(charClass, weapon):
+	if weapon == CHAR_CLASS_WEAPONS[charClass]:
+		return WEAPON_MODIFIER[weapon]
+
+	return 0
+
+def hero_stats(race, charClass, weapon, rng):
+	health = rng.randint(HEALTH_MINIMUM, HEALTH_MAXIMUM) - RACE_HEALTH[race]
+	strength = rng.randint(STRENGTH_MINIMUM, STRENGTH_MAXIMUM) + strength_modifier(charClass, weapon)
+
+	return health, strength
+
+def enemy_stats(rng):
+	health = rng.randint(HEALTH_MINIMUM, HEALTH_MAXIMUM)
+	strength = rng.randint(STRENGTH_MINIMUM, STRENGTH_MAXIMUM)
+
+	return health, strength
+
+def roll_initiative(rng):
+	enemyInitiative = rng.randint(INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM)
+	heroInitiative = rng.randint(INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM)
+
+	while heroInitiative == enemyInitiative:
+		heroInitiative = rng.randint(INITIATIVE_MINIMUM, INITIATIVE_MAXIMUM)
+
+	return heroInitiative, enemyInitiative
+
+def attack(attackerStrength, opponentHealth, rng):
+	roundHit = rng.randint(0, 1)
+
+	if roundHit == 1:
+		opponentHealth -= attackerStrength
+
+	return opponentHealth, opponentHealth >= 1, roundHit == 1
+
+def battle_round(heroHealth, heroStrength, enemyHealth, enemyStrength, rng):
+	heroInitiative, enemyInitiative = roll_initiative(rng)
+
+	if heroInitiative > enemyInitiative:
+		enemyHealth, enemyAlive, roundHit = attack(heroStrength, enemyHealth, rng)
+
+		if enemyAlive:
+			heroHealth, heroAlive, roundHit = attack(enemyStrength, heroHealth, rng)
+
+	else:
+		heroHealth, heroAlive, roundHit = attack(enemyStrength, heroHealth, rng)
+
+		if heroAlive:
+			enemyHealth, enemyAlive, roundHit = attack(heroStrength, enemyHealth, rng)
+
+	return heroHealth, enemyHealth
+
+def fight(heroHealth, heroStrength, enemyHealth, enemyStrength, rng):
+	rounds = 0
+
+	while heroHealth >= 1 and enemyHealth >= 1:
+		heroHealth, enemyHealth = battle_round(heroHealth, heroStrength, enemyHealth, enemyStrength, rng)
+		rounds += 1
+
+	return heroHealth >= 1, rounds, heroHealth, enemyHealth
+
+class BuildResult:
+	def __init__(self, race, charClass, weapon, enemy=""):
+		self.race = race
+		self.charClass = charClass
+		self.weapon = weapon
+		self.enemy = enemy
+		self.fights = 0
+		self.wins = 0
+		self.rounds = 0
+		self.healthCounts = {}
+
+	def add(self, heroWon, rounds, heroHealth):
+		self.fights += 1
+		self.wins += heroWon
+		self.rounds += rounds
+		remainingHealth = max(heroHealth, 0)
+		self.healthCounts[remainingHealth] = self.healthCounts.get(remainingHealth, 0) + 1
+
+	def add_batch(self, fights, wins, rounds, healthCounts):
+		self.fights += fights
+		self.wins += wins
+		self.rounds += rounds
+
+		for health, count in healthCounts.items():
+			self.healthCounts[health] = self.healthCounts.get(health, 0) + count
+
+	def merge(self, other):
+		self.add_batch(other.fights, other.wins, other.rounds, other.healthCounts)
+
+	def win_rate(self):
+		return self.wins / self.fights if self.fights else 0.0
+
+	def average_rounds(self):
+		return self.rounds / self.fights if self.fights else 0.0
+
+	def average_health(self):
+		return sum(health * count for health, count in self.healthCounts.items()) / self.fights if self.fights else 0.0
+
+	def health_percentile(self, percent):
+		rank = percent / 100 * self.fights
+		seen = 0
+
+		for health in sorted(self.healthCounts):
+			seen += self.healthCounts[health]
+
+			if seen >= rank:
+				return health
+
+		return 0
+
+def simulate_build(race, charClass, weapon, fights, rng):
+	result = BuildResult(race, charClass, weapon)
+
+	for fightNumber in range(fights):
+		heroHealth, heroStrength = hero_stats(race, charClass, weapon, rng)
+		enemyHealth, enemyStrength = enemy_stats(rng)
+		heroWon, rounds, heroHealth, enemyHealth = fight(heroHealth, heroStrength, enemyHealth, enemyStrength, rng)
+		result.add(heroWon, rounds, heroHealth)
+
+	return result
+
+def all_builds():
+	for race in RACE_OPTIONS:
+		for charClass in CHAR_CLASS_OPTIONS:
+			for weapon in WEAPON_OPTIONS:
+				yield race, charClass, weapon
+
+def all_matchups():
+	for race, charClass, weapon in all_builds():
+		for enemy in ENEMY_OPTIONS:
+			yield race, charClass, weapon, enemy
+
+ENEMY_OPTIONS = ["the Roman", "the Parthian", "the Celt", "the Gaul", "the Spartan", "the Egyptian"]
+WEAPON_OPTIONS = ["Two Handed Sword" , "Dagger", "Holy Cross", "Short Sword", "Dart", "Fighting Shield", "Double Daggers", "Long Bow", "Magic Staff", "Wand"]
+RACE_OPTIONS = ["Human", "Dwarf", "Halfling", "Elf", "Gnome", "Half-Orc", "Half-Elf"]
+RACE_HEALTH = {
+	"Human": 0,
+	"Dwarf": 3,
+	"Halfling": -3,
+	"Elf": 2,
+	"Gnome": -3,
+	"Half-Orc": 5,
+	"Half-Elf": 2
+	}
+CHAR_CLASS_OPTIONS = ["Barbarian", "Bard", "Cleric", "Fighter", "Druid", "Paladin", "Rogue", "Ranger", "Sorcerer" , "Wizard"]
+CHAR_CLASS_WEAPONS = {
+	"Barbarian": "Two Handed Sword",
+	"Bard": "Dagger",
+	"Cleric": "Holy Cross",
+	"Fighter": "Short Sword",
+	"Druid": "Dart",
+	"Paladin": "Fighting Shield",
+	"Rogue": "Double Daggers",
+	"Ranger": "Long Bow",
+	"Sorcerer": "Magic Staff",
+	"Wizard": "Wand"
+}
+WEAPON_MODIFIER = {
+	"Two Handed Sword": 5,
+	"Dagger": 3,
+	"Holy Cross": 1,
+	"Short Sword": 1,
+	"Dart": 3,
+	"Fighting Shield": 4,
+	"Double Daggers": 4,
+	"Long Bow": 3,
+	"Magic Staff": 2,
+	"Wand": 5
+}
+HEALTH_MINIMUM = 50
+HEALTH_MAXIMUM = 100
+STRENGTH_MINIMUM = 10
+STRENGTH_MAXIMUM = 25
+INITIATIVE_MINIMUM = 1
+INITIATIVE_MAXIMUM = 10
@@ -0,0 +1,150 @@
+import argparse, csv, functools, time, battle_engine
+from fractions import Fraction
+
+def hits_to_kill(health, strength):
+	return max(0, -(-health // strength))
+
+def round_outcomes(enemyHits, heroHits):
+	outcomes = []
+
+	for heroFirst in (True, False):
+		for firstHit in (True, False):
+			if heroFirst:
+				afterFirst = (enemyHits - firstHit, heroHits)
+			else:
+				afterFirst = (enemyHits, heroHits - firstHit)
+
+			if 0 in afterFirst:
+				outcomes.append((QUARTER, afterFirst))
+				continue
+
+			for secondHit in (True, False):
+				if heroFirst:
+					outcomes.append((EIGHTH, (afterFirst[0], afterFirst[1] - secondHit)))
+				else:
+					outcomes.append((EIGHTH, (afterFirst[0] - secondHit, afterFirst[1])))
+
+	return outcomes
+
+@functools.lru_cache(maxsize=None)
+def hit_odds(enemyHits, heroHits):
+	if heroHits == 0:
+		return Fraction(0), Fraction(0)
+
+	if enemyHits == 0:
+		return Fraction(1), Fraction(0)
+
+	stayProbability = Fraction(0)
+	winProbability = Fraction(0)
+	expectedRounds = Fraction(1)
+
+	for probability, state in round_outcomes(enemyHits, heroHits):
+		if state == (enemyHits, heroHits):
+			stayProbability += probability
+			continue
+
+		nextWin, nextRounds = hit_odds(*state)
+		winProbability += probability * nextWin
+		expectedRounds += probability * nextRounds
+
+	return winProbability / (1 - stayProbability), expectedRounds / (1 - stayProbability)
+
+def fight_odds(heroHealth, heroStrength, enemyHealth, enemyStrength):
+	if heroStrength < 1 or enemyStrength < 1:
+		raise ValueError("strengths must be at least 1")
+
+	return hit_odds(hits_to_kill(enemyHealth, heroStrength), hits_to_kill(heroHealth, enemyStrength))
+
+def hit_counts(healths, strength):
+	counts = {}
+
+	for health in healths:
+		hits = hits_to_kill(health, strength)
+		counts[hits] = counts.get(hits, 0) + 1
+
+	return counts
+
+@functools.lru_cache(maxsize=None)
+def stat_odds(raceHealth, strengthModifier):
+	healthRolls = range(battle_engine.HEALTH_MINIMUM, battle_engine.HEALTH_MAXIMUM + 1)
+	strengthRolls = range(battle_engine.STRENGTH_MINIMUM, battle_engine.STRENGTH_MAXIMUM + 1)
+
+	enemyHitCounts = [hit_counts(healthRolls, strength + strengthModifier) for strength in strengthRolls]
+	heroHitCounts = [hit_counts([health - raceHealth for health in healthRolls], strength) for strength in strengthRolls]
+
+	winProbability = Fraction(0)
+	expectedRounds = Fraction(0)
+
+	for enemyCounts in enemyHitCounts:
+		for heroCounts in heroHitCounts:
+			for enemyHits, enemyCount in enemyCounts.items():
+				for heroHits, heroCount in heroCounts.items():
+					nextWin, nextRounds = hit_odds(enemyHits, heroHits)
+					winProbability += enemyCount * heroCount * nextWin
+					expectedRounds += enemyCount * heroCount * nextRounds
+
+	rolls = (len(healthRolls) * len(strengthRolls)) ** 2
+
+	return winProbability / rolls, expectedRounds / rolls
+
+def build_odds(race, charClass, weapon):
+	return stat_odds(battle_engine.RACE_HEALTH[race], battle_engine.strength_modifier(charClass, weapon))
+
+def matchup_table(withEnemies):
+	rows = []
+
+	for race, charClass, weapon in battle_engine.all_builds():
+		winProbability, expectedRounds = build_odds(race, charClass, weapon)
+
+		for enemy in (battle_engine.ENEMY_OPTIONS if withEnemies else [""]):
+			rows.append([race, charClass, weapon, enemy, winProbability, expectedRounds])
+
+	return rows
+
+def main():
+	parser = argparse.ArgumentParser(description="Work out exact win probabilities and expected rounds for The Battle.")
+	parser.add_argument("--fight", type=int, nargs=4, metavar=("HERO_HP", "HERO_STR", "ENEMY_HP", "ENEMY_STR"), help="odds of one fight with known stats")
+	parser.add_argument("--enemies", action="store_true", help="list every enemy as its own matchup")
+	parser.add_argument("--fractions", action="store_true", help="print exact fractions instead of decimals")
+	parser.add_argument("--csv", help="file to write the matchup table to as CSV")
+	args = parser.parse_args()
+
+	formatValue = str if args.fractions else lambda value: "{:.6f}".format(float(value))
+
+	if args.fight:
+		try:
+			winProbability, expectedRounds = fight_odds(*args.fight)
+
+		except ValueError as error:
+			parser.error(str(error))
+
+		print("P(win): {} | Expected rounds: {}".format(formatValue(winProbability), formatValue(expectedRounds)))
+		return
+
+	startTime = time.perf_counter()
+	rows = matchup_table(args.enemies)
+	elapsed = time.perf_counter() - startTime
+	rows.sort(key=lambda row: row[4], reverse=True)
+
+	print(TABLE_FORMAT.format(*TABLE_HEADINGS))
+
+	for row in rows:
+		print(TABLE_FORMAT.format(*row[:4], formatValue(row[4]), formatValue(row[5])))
+
+	print("\nWorked out {} matchups in {:.2f}s.".format(len(rows), elapsed))
+
+	if args.csv:
+		with open(args.csv, "w", newline="") as csvFile:
+			writer = csv.writer(csvFile)
+			writer.writerow(TABLE_HEADINGS)
+
+			for row in rows:
+				writer.writerow(row[:4] + [formatValue(row[4]), formatValue(row[5])])
+
+QUARTER = Fraction(1, 4)
+EIGHTH = Fraction(1, 8)
+TABLE_HEADINGS = ["Race", "Class", "Weapon", "Enemy", "P(win)", "Rounds"]
+TABLE_FORMAT = "{:<9} {:<10} {:<17} {:<13} {:>10} {:>10}"
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,142 @@
+import argparse, json, os, random, sys, time, battle_engine
+
+def play_game(name, race, charClass, weapon, rng):
+	heroHealth, heroStrength = battle_engine.hero_stats(race, charClass, weapon, rng)
+	rng.randint(battle_engine.INITIATIVE_MINIMUM, battle_engine.INITIATIVE_MAXIMUM)
+
+	enemy = rng.choice(battle_engine.ENEMY_OPTIONS)
+	enemyWeapon = rng.choice(battle_engine.WEAPON_OPTIONS)
+	enemyHealth, enemyStrength = battle_engine.enemy_stats(rng)
+	rng.randint(battle_engine.INITIATIVE_MINIMUM, battle_engine.INITIATIVE_MAXIMUM)
+
+	heroWon, rounds, heroHealth, enemyHealth = battle_engine.fight(heroHealth, heroStrength, enemyHealth, enemyStrength, rng)
+
+	return {
+		"name": name,
+		"race": race,
+		"class": charClass,
+		"weapon": weapon,
+		"strength": heroStrength,
+		"enemy": enemy,
+		"enemyWeapon": enemyWeapon,
+		"enemyStrength": enemyStrength,
+		"won": heroWon,
+		"rounds": rounds,
+		"heroHealth": heroHealth,
+		"enemyHealth": enemyHealth
+		}
+
+def is_integer(value):
+	return isinstance(value, int) and not isinstance(value, bool)
+
+def check_request(request):
+	for key, options in (("race", battle_engine.RACE_OPTIONS), ("class", battle_engine.CHAR_CLASS_OPTIONS), ("weapon", battle_engine.WEAPON_OPTIONS)):
+		if request.get(key) not in options:
+			raise ValueError("{} must be one of {}".format(key, ", ".join(options)))
+
+	if not str(request.get("name", DEFAULT_NAME)).isalpha():
+		raise ValueError("name must only contain letters A-Z")
+
+	if not is_integer(request.get("games", 1)) or request.get("games", 1) < 1:
+		raise ValueError("games must be a positive integer")
+
+	if request.get("seed") is not None and not is_integer(request["seed"]):
+		raise ValueError("seed must be an integer")
+
+def request_rng(request, rng):
+	if request.get("seed") is not None:
+		return random.Random(request["seed"])
+
+	return rng
+
+def run_request(request, rng):
+	check_request(request)
+	rng = request_rng(request, rng)
+	name = str(request.get("name", DEFAULT_NAME)).capitalize()
+
+	for gameNumber in range(request.get("games", 1)):
+		yield play_game(name, request["race"], request["class"], request["weapon"], rng)
+
+def read_requests(stream):
+	for lineNumber, line in enumerate(stream, 1):
+		if not line.strip():
+			continue
+
+		try:
+			request = json.loads(line)
+
+			if not isinstance(request, dict):
+				raise ValueError("request must be a JSON object")
+
+		except ValueError as error:
+			yield lineNumber, None, str(error)
+			continue
+
+		yield lineNumber, request, None
+
+def run_stream(stream, rng, output):
+	games = 0
+
+	for lineNumber, request, error in read_requests(stream):
+		if error is None:
+			try:
+				for game in run_request(request, rng):
+					games += 1
+					game["request"] = request.get("id", lineNumber)
+					output.write(json.dumps(game) + "\n")
+
+				continue
+
+			except ValueError as requestError:
+				error = str(requestError)
+
+		output.write(json.dumps({"request": request.get("id", lineNumber) if request else lineNumber, "error": error}) + "\n")
+
+	return games
+
+def main():
+	parser = argparse.ArgumentParser(description="Play games of The Battle without prompts, writing each result as a line of JSON.")
+	parser.add_argument("--name", default=DEFAULT_NAME, help="name of the hero")
+	parser.add_argument("--race", choices=battle_engine.RACE_OPTIONS, help="race of the hero")
+	parser.add_argument("--class", dest="charClass", choices=battle_engine.CHAR_CLASS_OPTIONS, help="character class of the hero")
+	parser.add_argument("--weapon", choices=battle_engine.WEAPON_OPTIONS, help="weapon of the hero")
+	parser.add_argument("--games", type=int, default=1, help="games to play back-to-back")
+	parser.add_argument("--seed", type=int, help="seed for the random number generator")
+	parser.add_argument("--requests", metavar="FILE", help="read JSON-lines requests from this file ('-' for standard input) instead of the hero arguments")
+	parser.add_argument("--output", metavar="FILE", help="file to write the results to instead of standard output")
+	parser.add_argument("--quiet", action="store_true", help="only print the summary")
+	args = parser.parse_args()
+
+	if not args.requests and not (args.race and args.charClass and args.weapon):
+		parser.error("either --requests or all of --race, --class and --weapon are required")
+
+	rng = random.Random(args.seed)
+	output = sys.stdout
+
+	if args.quiet or args.output:
+		output = open(os.devnull if args.quiet else args.output, "w")
+
+	startTime = time.perf_counter()
+
+	try:
+		if args.requests:
+			stream = sys.stdin if args.requests == "-" else open(args.requests)
+
+			with stream:
+				games = run_stream(stream, rng, output)
+
+		else:
+			request = {"name": args.name, "race": args.race, "class": args.charClass, "weapon": args.weapon, "games": args.games}
+			games = run_stream([json.dumps(request)], rng, output)
+
+	finally:
+		if output is not sys.stdout:
+			output.close()
+
+	elapsed = time.perf_counter() - startTime
+	print("Played {} games in {:.2f}s ({:.0f} games/sec).".format(games, elapsed, games / elapsed if elapsed else 0), file=sys.stderr)
+
+DEFAULT_NAME = "Hero"
+
+if __name__ == "__main__":
+	main()
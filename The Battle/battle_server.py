@@ -0,0 +1,234 @@
+import argparse, asyncio, json, random, time, battle_engine, battle_runner
+
+class Enemy:
+	def __init__(self, rng):
+		self.enemy = rng.choice(battle_engine.ENEMY_OPTIONS)
+		self.weapon = rng.choice(battle_engine.WEAPON_OPTIONS)
+		self.health, self.strength = battle_engine.enemy_stats(rng)
+		self.initiative = rng.randint(battle_engine.INITIATIVE_MINIMUM, battle_engine.INITIATIVE_MAXIMUM)
+		self.alive = True
+
+class Hero:
+	def __init__(self, name, race, charClass, weapon, rng):
+		self.name = name
+		self.race = race
+		self.charClass = charClass
+		self.weapon = weapon
+		self.health, self.strength = battle_engine.hero_stats(race, charClass, weapon, rng)
+		self.strengthModifier = battle_engine.strength_modifier(charClass, weapon)
+		self.initiative = rng.randint(battle_engine.INITIATIVE_MINIMUM, battle_engine.INITIATIVE_MAXIMUM)
+		self.alive = True
+
+class Session:
+	def __init__(self, rng):
+		self.rng = rng
+		self.hero = None
+		self.enemy = None
+		self.rounds = 0
+
+	def new_game(self, request):
+		battle_runner.check_request(request)
+		self.rng = battle_runner.request_rng(request, self.rng)
+		self.hero = Hero(str(request.get("name", battle_runner.DEFAULT_NAME)).capitalize(), request["race"], request["class"], request["weapon"], self.rng)
+		self.enemy = Enemy(self.rng)
+		self.rounds = 0
+
+		return {
+			"event": "start",
+			"name": self.hero.name,
+			"health": self.hero.health,
+			"strength": self.hero.strength,
+			"strengthModifier": self.hero.strengthModifier,
+			"enemy": self.enemy.enemy,
+			"enemyWeapon": self.enemy.weapon,
+			"enemyHealth": self.enemy.health,
+			"enemyStrength": self.enemy.strength
+			}
+
+	def attack(self, attacker, defender):
+		defender.health, defender.alive, roundHit = battle_engine.attack(attacker.strength, defender.health, self.rng)
+
+		return {"attacker": attacker.name if attacker is self.hero else attacker.enemy, "hit": roundHit, "health": defender.health}
+
+	def battle(self):
+		if self.hero is None:
+			raise ValueError("start a game with the new action first")
+
+		self.hero.initiative, self.enemy.initiative = battle_engine.roll_initiative(self.rng)
+		first, second = (self.hero, self.enemy) if self.hero.initiative > self.enemy.initiative else (self.enemy, self.hero)
+		attacks = [self.attack(first, second)]
+
+		if second.alive:
+			attacks.append(self.attack(second, first))
+
+		self.rounds += 1
+		response = {"event": "round", "round": self.rounds, "attacks": attacks, "health": self.hero.health, "enemyHealth": self.enemy.health, "outcome": None}
+
+		if not self.enemy.alive:
+			response["outcome"] = "won"
+
+		elif not self.hero.alive:
+			response["outcome"] = "lost"
+
+		if response["outcome"]:
+			self.hero = self.enemy = None
+
+		return response
+
+	def flee(self):
+		if self.hero is None:
+			raise ValueError("start a game with the new action first")
+
+		self.hero = self.enemy = None
+
+		return {"event": "fled", "round": self.rounds}
+
+	def handle(self, request):
+		action = request.get("action")
+
+		if action == "new":
+			return self.new_game(request)
+
+		elif action == "attack":
+			return self.battle()
+
+		elif action == "flee":
+			return self.flee()
+
+		raise ValueError("action must be one of {}".format(", ".join(ACTION_OPTIONS)))
+
+class BattleServer:
+	def __init__(self, maxSessions, idleTimeout, seed=None):
+		self.maxSessions = maxSessions
+		self.idleTimeout = idleTimeout
+		self.seed = seed
+		self.sessions = 0
+		self.sessionsStarted = 0
+		self.requests = 0
+		self.games = 0
+
+	def session_rng(self):
+		if self.seed is None:
+			return random.Random()
+
+		return random.Random("{} {}".format(self.seed, self.sessionsStarted))
+
+	def respond(self, session, line):
+		try:
+			request = json.loads(line)
+
+			if not isinstance(request, dict):
+				raise ValueError("request must be a JSON object")
+
+			if request.get("action") == "quit":
+				return {"event": "bye"}, False
+
+			response = session.handle(request)
+
+			if response.get("outcome"):
+				self.games += 1
+
+			return response, True
+
+		except ValueError as error:
+			return {"error": str(error)}, True
+
+	async def send(self, writer, response):
+		writer.write(json.dumps(response).encode() + b"\n")
+		await writer.drain()
+
+	async def handle_connection(self, reader, writer):
+		if self.sessions >= self.maxSessions:
+			await self.send(writer, {"error": "server is full"})
+			writer.close()
+			return
+
+		self.sessions += 1
+		session = Session(self.session_rng())
+		self.sessionsStarted += 1
+
+		try:
+			await self.send(writer, {"event": "welcome", "races": battle_engine.RACE_OPTIONS, "classes": battle_engine.CHAR_CLASS_OPTIONS, "weapons": battle_engine.WEAPON_OPTIONS})
+
+			while True:
+				try:
+					line = await asyncio.wait_for(reader.readline(), self.idleTimeout)
+
+				except asyncio.TimeoutError:
+					await self.send(writer, {"error": "idle for too long"})
+					break
+
+				except ValueError:
+					await self.send(writer, {"error": "line longer than {} bytes".format(MAX_LINE_LENGTH)})
+					break
+
+				if not line:
+					break
+
+				if not line.strip():
+					continue
+
+				self.requests += 1
+				response, keepOpen = self.respond(session, line)
+				await self.send(writer, response)
+
+				if not keepOpen:
+					break
+
+		except ConnectionError:
+			pass
+
+		finally:
+			self.sessions -= 1
+			writer.close()
+
+	async def report(self, interval):
+		lastTime = time.perf_counter()
+		lastRequests = self.requests
+
+		while True:
+			await asyncio.sleep(interval)
+			now = time.perf_counter()
+			rate = (self.requests - lastRequests) / (now - lastTime)
+			print("{} sessions open | {} games finished | {:.0f} requests/sec".format(self.sessions, self.games, rate), flush=True)
+			lastTime, lastRequests = now, self.requests
+
+	async def serve(self, host, port, reportInterval):
+		server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE_LENGTH, backlog=DEFAULT_BACKLOG)
+		print("Serving The Battle on {}:{}".format(host, port), flush=True)
+
+		async with server:
+			if reportInterval:
+				reportTask = asyncio.create_task(self.report(reportInterval))
+
+			await server.serve_forever()
+
+def main():
+	parser = argparse.ArgumentParser(description="Host games of The Battle for many players over a JSON-lines TCP protocol.")
+	parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+	parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+	parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS, help="connections to serve at once")
+	parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, help="seconds to wait for a request before closing a connection")
+	parser.add_argument("--seed", type=int, help="seed the stream of every session is derived from")
+	parser.add_argument("--report-interval", type=float, default=DEFAULT_REPORT_INTERVAL, help="seconds between status reports (0 for none)")
+	args = parser.parse_args()
+
+	server = BattleServer(args.max_sessions, args.idle_timeout, args.seed)
+
+	try:
+		asyncio.run(server.serve(args.host, args.port, args.report_interval))
+
+	except KeyboardInterrupt:
+		print("\nStopped after {} games.".format(server.games))
+
+ACTION_OPTIONS = ("new", "attack", "flee", "quit")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8642
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_IDLE_TIMEOUT = 300
+DEFAULT_REPORT_INTERVAL = 10
+DEFAULT_BACKLOG = 1024
+MAX_LINE_LENGTH = 4096
+
+if __name__ == "__main__":
+	main()
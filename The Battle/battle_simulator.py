@@ -0,0 +1,92 @@
+import argparse, csv, random, time, battle_engine
+
+def group_key(result, group):
+	if group == "race":
+		return (result.race, "", "", "")
+
+	elif group == "class":
+		return ("", result.charClass, "", "")
+
+	elif group == "weapon":
+		return ("", "", result.weapon, "")
+
+	elif group == "enemy":
+		return ("", "", "", result.enemy)
+
+	return (result.race, result.charClass, result.weapon, result.enemy)
+
+def group_results(results, group):
+	groups = {}
+
+	for result in results:
+		key = group_key(result, group)
+
+		if key not in groups:
+			groups[key] = battle_engine.BuildResult(*key)
+
+		groups[key].merge(result)
+
+	return list(groups.values())
+
+def result_row(result):
+	row = [result.race, result.charClass, result.weapon, result.enemy, result.fights, round(result.win_rate() * 100, 2), round(result.average_rounds(), 2), round(result.average_health(), 2)]
+
+	for percent in HEALTH_PERCENTILES:
+		row.append(result.health_percentile(percent))
+
+	return row
+
+def print_table(results):
+	print(TABLE_FORMAT.format(*TABLE_HEADINGS))
+
+	for result in results:
+		print(TABLE_FORMAT.format(*result_row(result)))
+
+def write_csv(fileName, results):
+	with open(fileName, "w", newline="") as csvFile:
+		writer = csv.writer(csvFile)
+		writer.writerow(TABLE_HEADINGS)
+
+		for result in results:
+			writer.writerow(result_row(result))
+
+def main():
+	parser = argparse.ArgumentParser(description="Simulate full fights for every hero build of The Battle.")
+	parser.add_argument("--fights", type=int, default=DEFAULT_FIGHTS, help="fights to simulate for each build")
+	parser.add_argument("--seed", type=int, help="seed for the random number generator")
+	parser.add_argument("--race", choices=battle_engine.RACE_OPTIONS, help="only simulate heroes of this race")
+	parser.add_argument("--class", dest="charClass", choices=battle_engine.CHAR_CLASS_OPTIONS, help="only simulate heroes of this class")
+	parser.add_argument("--weapon", choices=battle_engine.WEAPON_OPTIONS, help="only simulate heroes with this weapon")
+	parser.add_argument("--group", choices=GROUP_OPTIONS, default="build", help="combine the results of builds sharing a race, class, weapon or enemy")
+	parser.add_argument("--csv", help="file to write the results to as CSV")
+	args = parser.parse_args()
+
+	rng = random.Random(args.seed)
+	results = []
+	startTime = time.perf_counter()
+
+	for race, charClass, weapon in battle_engine.all_builds():
+		if args.race not in (None, race) or args.charClass not in (None, charClass) or args.weapon not in (None, weapon):
+			continue
+
+		results.append(battle_engine.simulate_build(race, charClass, weapon, args.fights, rng))
+
+	elapsed = time.perf_counter() - startTime
+	totalFights = sum(result.fights for result in results)
+
+	results = group_results(results, args.group)
+	results.sort(key=lambda result: result.win_rate(), reverse=True)
+	print_table(results)
+	print("\nSimulated {} fights in {:.1f}s ({:.0f} fights/sec).".format(totalFights, elapsed, totalFights / elapsed))
+
+	if args.csv:
+		write_csv(args.csv, results)
+
+DEFAULT_FIGHTS = 10000
+HEALTH_PERCENTILES = (10, 50, 90)
+GROUP_OPTIONS = ("build", "race", "class", "weapon", "enemy")
+TABLE_HEADINGS = ["Race", "Class", "Weapon", "Enemy", "Fights", "Win %", "Rounds", "Avg HP"] + ["P{} HP".format(percent) for percent in HEALTH_PERCENTILES]
+TABLE_FORMAT = "{:<9} {:<10} {:<17} {:<13} {:>8} {:>7} {:>7} {:>7}" + " {:>6}" * len(HEALTH_PERCENTILES)
+
+if __name__ == "__main__":
+	main()
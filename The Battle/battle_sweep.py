@@ -0,0 +1,77 @@
+import argparse, multiprocessing, os, random, time, battle_engine, battle_simulator
+
+def shard_rng(seed, shardIndex, engine):
+	if engine == "vector":
+		import numpy as np
+
+		return np.random.default_rng([seed, shardIndex])
+
+	return random.Random("{} {}".format(seed, shardIndex))
+
+def run_shard(shard):
+	shardIndex, matchup, fights, seed, engine = shard
+	rng = shard_rng(seed, shardIndex, engine)
+
+	if engine == "vector":
+		import battle_vector
+
+		return battle_vector.simulate_matchups([matchup], fights, rng)[0]
+
+	race, charClass, weapon, enemy = matchup
+	result = battle_engine.simulate_build(race, charClass, weapon, fights, rng)
+	result.enemy = enemy
+
+	return result
+
+def build_shards(fights, seed, engine):
+	return [(shardIndex, matchup, fights, seed, engine) for shardIndex, matchup in enumerate(battle_engine.all_matchups())]
+
+def run_sweep(shards, workers):
+	if workers == 1:
+		return [run_shard(shard) for shard in shards]
+
+	chunkSize = max(1, len(shards) // (workers * CHUNKS_PER_WORKER))
+
+	with multiprocessing.Pool(workers) as pool:
+		return list(pool.imap(run_shard, shards, chunkSize))
+
+def write_tables(outputDirectory, results):
+	os.makedirs(outputDirectory, exist_ok=True)
+	fileNames = []
+
+	for group in battle_simulator.GROUP_OPTIONS:
+		groupedResults = battle_simulator.group_results(results, group)
+		fileName = os.path.join(outputDirectory, "{}.csv".format(group))
+		battle_simulator.write_csv(fileName, groupedResults)
+		fileNames.append(fileName)
+
+	return fileNames
+
+def main():
+	parser = argparse.ArgumentParser(description="Sweep every matchup of The Battle across a pool of worker processes.")
+	parser.add_argument("--fights", type=int, default=DEFAULT_FIGHTS, help="fights to simulate for each matchup")
+	parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed the stream of every shard is derived from")
+	parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes to use")
+	parser.add_argument("--engine", choices=("scalar", "vector"), default="scalar", help="simulate with the scalar engine or the NumPy-vectorized one")
+	parser.add_argument("--output", default=DEFAULT_OUTPUT, help="directory to write the CSV tables to")
+	args = parser.parse_args()
+
+	shards = build_shards(args.fights, args.seed, args.engine)
+
+	startTime = time.perf_counter()
+	results = run_sweep(shards, args.workers)
+	elapsed = time.perf_counter() - startTime
+	totalFights = sum(result.fights for result in results)
+
+	for fileName in write_tables(args.output, results):
+		print("Wrote {}".format(fileName))
+
+	print("\nSimulated {} fights over {} shards with {} workers in {:.1f}s ({:.0f} fights/sec).".format(totalFights, len(shards), args.workers, elapsed, totalFights / elapsed))
+
+DEFAULT_FIGHTS = 10000
+DEFAULT_SEED = 0
+DEFAULT_OUTPUT = "sweep"
+CHUNKS_PER_WORKER = 4
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,210 @@
+import argparse, csv, json, os, random, signal, time, battle_engine
+
+def round_robin(playerCount):
+	order = list(range(playerCount))
+
+	if len(order) % 2:
+		order.append(None)
+
+	for roundNumber in range(len(order) - 1):
+		for position in range(len(order) // 2):
+			first = order[position]
+			second = order[-1 - position]
+
+			if first is not None and second is not None:
+				yield first, second
+
+		order.insert(1, order.pop())
+
+def schedule(playerCount, cycles, startMatch):
+	matchNumber = 0
+
+	for cycle in range(cycles):
+		for first, second in round_robin(playerCount):
+			if matchNumber >= startMatch:
+				yield matchNumber, first, second
+
+			matchNumber += 1
+
+def play_matches(matches, builds, rng):
+	for matchNumber, first, second in matches:
+		firstHealth, firstStrength = battle_engine.hero_stats(*builds[first], rng)
+		secondHealth, secondStrength = battle_engine.hero_stats(*builds[second], rng)
+		firstWon, rounds, firstHealth, secondHealth = battle_engine.fight(firstHealth, firstStrength, secondHealth, secondStrength, rng)
+
+		yield matchNumber, first, second, firstWon
+
+def expected_score(rating, opponentRating):
+	return 1 / (1 + 10 ** ((opponentRating - rating) / ELO_SCALE))
+
+def update_ratings(state, first, second, firstWon):
+	ratings = state["ratings"]
+	change = state["kFactor"] * (firstWon - expected_score(ratings[first], ratings[second]))
+	ratings[first] += change
+	ratings[second] -= change
+
+	winner = first if firstWon else second
+	state["wins"][winner] += 1
+	state["games"][first] += 1
+	state["games"][second] += 1
+
+def new_state(playerCount, cycles, kFactor, seed):
+	return {
+		"version": CHECKPOINT_VERSION,
+		"cycles": cycles,
+		"kFactor": kFactor,
+		"seed": seed,
+		"matches": 0,
+		"ratings": [INITIAL_RATING] * playerCount,
+		"wins": [0] * playerCount,
+		"games": [0] * playerCount,
+		"rngState": rng_state(random.Random(seed))
+		}
+
+def rng_state(rng):
+	version, internalState, gaussNext = rng.getstate()
+
+	return [version, list(internalState), gaussNext]
+
+def restore_rng(state):
+	version, internalState, gaussNext = state["rngState"]
+	rng = random.Random()
+	rng.setstate((version, tuple(internalState), gaussNext))
+
+	return rng
+
+def load_checkpoint(fileName):
+	try:
+		with open(fileName) as checkpointFile:
+			state = json.load(checkpointFile)
+
+	except FileNotFoundError:
+		return None
+
+	if state.get("version") != CHECKPOINT_VERSION:
+		raise ValueError("{} is not a version {} tournament checkpoint".format(fileName, CHECKPOINT_VERSION))
+
+	return state
+
+def save_checkpoint(fileName, state, rng):
+	state["rngState"] = rng_state(rng)
+	temporaryName = fileName + ".tmp"
+
+	with open(temporaryName, "w") as checkpointFile:
+		json.dump(state, checkpointFile)
+
+	os.replace(temporaryName, fileName)
+
+def run_tournament(state, builds, checkpointFile=None, checkpointInterval=None, reportInterval=None, stopRequests=()):
+	rng = restore_rng(state)
+	totalMatches = state["cycles"] * (len(builds) * (len(builds) - 1) // 2)
+	matches = play_matches(schedule(len(builds), state["cycles"], state["matches"]), builds, rng)
+
+	startTime = lastReport = lastCheckpoint = time.perf_counter()
+	startMatches = state["matches"]
+
+	try:
+		for matchNumber, first, second, firstWon in matches:
+			update_ratings(state, first, second, firstWon)
+			state["matches"] = matchNumber + 1
+
+			if stopRequests:
+				break
+
+			if reportInterval or checkpointFile:
+				now = time.perf_counter()
+
+				if reportInterval and now - lastReport >= reportInterval:
+					rate = (state["matches"] - startMatches) / (now - startTime)
+					print("{}/{} matches ({:.0f} matches/sec)".format(state["matches"], totalMatches, rate), flush=True)
+					lastReport = now
+
+				if checkpointFile and now - lastCheckpoint >= checkpointInterval:
+					save_checkpoint(checkpointFile, state, rng)
+					lastCheckpoint = now
+
+	finally:
+		if checkpointFile:
+			save_checkpoint(checkpointFile, state, rng)
+
+	return state["matches"] == totalMatches
+
+def ranking(state, builds):
+	rows = []
+
+	for player, build in enumerate(builds):
+		games = state["games"][player]
+		winRate = state["wins"][player] / games if games else 0.0
+		rows.append(list(build) + [round(state["ratings"][player], 1), games, round(winRate * 100, 2)])
+
+	rows.sort(key=lambda row: row[3], reverse=True)
+
+	return rows
+
+def main():
+	parser = argparse.ArgumentParser(description="Rank every hero build of The Battle in a round-robin tournament with Elo ratings.")
+	parser.add_argument("--cycles", type=int, help="times every build plays every other build (default {})".format(DEFAULT_CYCLES))
+	parser.add_argument("--k-factor", type=float, help="largest rating change from one match (default {})".format(DEFAULT_K_FACTOR))
+	parser.add_argument("--seed", type=int, help="seed for the random number generator (default {})".format(DEFAULT_SEED))
+	parser.add_argument("--checkpoint", help="file to save progress to, resuming from it if it exists")
+	parser.add_argument("--checkpoint-interval", type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help="seconds between checkpoints")
+	parser.add_argument("--report-interval", type=float, default=DEFAULT_REPORT_INTERVAL, help="seconds between progress reports")
+	parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="builds to list when finished")
+	parser.add_argument("--csv", help="file to write the full ranking to as CSV")
+	args = parser.parse_args()
+
+	builds = list(battle_engine.all_builds())
+	state = None
+
+	if args.checkpoint:
+		state = load_checkpoint(args.checkpoint)
+
+		if state:
+			for key, flag, value in (("cycles", "--cycles", args.cycles), ("kFactor", "--k-factor", args.k_factor), ("seed", "--seed", args.seed)):
+				if value is None:
+					continue
+
+				if key not in state:
+					print("Warning: {} was not saved in {}, so {} {} cannot be checked.".format(key, args.checkpoint, flag, value))
+
+				elif value != state[key]:
+					parser.error("{} {} differs from the {} saved in {}; leave it out to resume, or use a new checkpoint".format(flag, value, state[key], args.checkpoint))
+
+			print("Resuming from match {} of {}.".format(state["matches"], args.checkpoint))
+
+	if state is None:
+		state = new_state(len(builds), DEFAULT_CYCLES if args.cycles is None else args.cycles, DEFAULT_K_FACTOR if args.k_factor is None else args.k_factor, DEFAULT_SEED if args.seed is None else args.seed)
+
+	stopRequests = []
+	signal.signal(signal.SIGINT, lambda signalNumber, frame: stopRequests.append(signalNumber))
+
+	if not run_tournament(state, builds, args.checkpoint, args.checkpoint_interval, args.report_interval, stopRequests):
+		print("\nStopped at match {}.".format(state["matches"]))
+		return
+
+	rows = ranking(state, builds)
+	print("\n" + TABLE_FORMAT.format(*TABLE_HEADINGS))
+
+	for row in rows[:args.top]:
+		print(TABLE_FORMAT.format(*row))
+
+	if args.csv:
+		with open(args.csv, "w", newline="") as csvFile:
+			writer = csv.writer(csvFile)
+			writer.writerow(TABLE_HEADINGS)
+			writer.writerows(rows)
+
+CHECKPOINT_VERSION = 1
+INITIAL_RATING = 1500
+ELO_SCALE = 400
+DEFAULT_K_FACTOR = 4
+DEFAULT_CYCLES = 10
+DEFAULT_SEED = 0
+DEFAULT_CHECKPOINT_INTERVAL = 60
+DEFAULT_REPORT_INTERVAL = 5
+DEFAULT_TOP = 20
+TABLE_HEADINGS = ["Race", "Class", "Weapon", "Elo", "Games", "Win %"]
+TABLE_FORMAT = "{:<9} {:<10} {:<17} {:>8} {:>8} {:>7}"
+
+if __name__ == "__main__":
+	main()
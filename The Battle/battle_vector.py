@@ -0,0 +1,138 @@
+import argparse, math, random, time, battle_engine, battle_simulator
+import numpy as np
+
+def roll_initiative(count, rng):
+	enemyInitiative = rng.integers(battle_engine.INITIATIVE_MINIMUM, battle_engine.INITIATIVE_MAXIMUM + 1, count)
+	heroInitiative = rng.integers(battle_engine.INITIATIVE_MINIMUM, battle_engine.INITIATIVE_MAXIMUM + 1, count)
+	tied = np.flatnonzero(heroInitiative == enemyInitiative)
+
+	while tied.size:
+		heroInitiative[tied] = rng.integers(battle_engine.INITIATIVE_MINIMUM, battle_engine.INITIATIVE_MAXIMUM + 1, tied.size)
+		tied = tied[heroInitiative[tied] == enemyInitiative[tied]]
+
+	return heroInitiative > enemyInitiative
+
+def simulate_fights(heroHealth, heroStrength, enemyHealth, enemyStrength, rng):
+	heroHealth = np.array(heroHealth, dtype=np.int64)
+	enemyHealth = np.array(enemyHealth, dtype=np.int64)
+	heroStrength = np.asarray(heroStrength, dtype=np.int64)
+	enemyStrength = np.asarray(enemyStrength, dtype=np.int64)
+	rounds = np.zeros(len(heroHealth), dtype=np.int64)
+	active = np.flatnonzero((heroHealth >= 1) & (enemyHealth >= 1))
+
+	while active.size:
+		activeHeroHealth = heroHealth[active]
+		activeEnemyHealth = enemyHealth[active]
+		activeHeroStrength = heroStrength[active]
+		activeEnemyStrength = enemyStrength[active]
+
+		heroFirst = roll_initiative(active.size, rng)
+		firstHit = rng.integers(0, 2, active.size) == 1
+		secondHit = rng.integers(0, 2, active.size) == 1
+
+		activeEnemyHealth -= np.where(heroFirst & firstHit, activeHeroStrength, 0)
+		activeHeroHealth -= np.where(~heroFirst & firstHit, activeEnemyStrength, 0)
+
+		secondAlive = np.where(heroFirst, activeEnemyHealth >= 1, activeHeroHealth >= 1)
+		activeHeroHealth -= np.where(heroFirst & secondAlive & secondHit, activeEnemyStrength, 0)
+		activeEnemyHealth -= np.where(~heroFirst & secondAlive & secondHit, activeHeroStrength, 0)
+
+		heroHealth[active] = activeHeroHealth
+		enemyHealth[active] = activeEnemyHealth
+		rounds[active] += 1
+		active = active[(activeHeroHealth >= 1) & (activeEnemyHealth >= 1)]
+
+	return heroHealth >= 1, rounds, heroHealth, enemyHealth
+
+def add_results(results, matchupIndex, heroWon, rounds, heroHealth):
+	first = int(matchupIndex[0])
+	localIndex = matchupIndex - first
+	size = int(localIndex[-1]) + 1
+
+	fightCounts = np.bincount(localIndex, minlength=size)
+	winCounts = np.bincount(localIndex, weights=heroWon, minlength=size)
+	roundCounts = np.bincount(localIndex, weights=rounds, minlength=size)
+
+	remainingHealth = np.maximum(heroHealth, 0)
+	healthSlots = int(remainingHealth.max()) + 1
+	healthCounts = np.bincount(localIndex * healthSlots + remainingHealth, minlength=size * healthSlots).reshape(size, healthSlots)
+
+	for offset in range(size):
+		counts = healthCounts[offset]
+		results[first + offset].add_batch(int(fightCounts[offset]), int(winCounts[offset]), int(roundCounts[offset]), {int(health): int(counts[health]) for health in np.flatnonzero(counts)})
+
+def simulate_matchups(matchups, fights, rng, batchSize=None):
+	batchSize = batchSize or DEFAULT_BATCH_SIZE
+	results = [battle_engine.BuildResult(*matchup) for matchup in matchups]
+	raceHealth = np.array([battle_engine.RACE_HEALTH[matchup[0]] for matchup in matchups])
+	strengthModifier = np.array([battle_engine.strength_modifier(matchup[1], matchup[2]) for matchup in matchups])
+	totalFights = len(matchups) * fights
+
+	for start in range(0, totalFights, batchSize):
+		stop = min(start + batchSize, totalFights)
+		matchupIndex = np.arange(start, stop) // fights
+
+		heroHealth = rng.integers(battle_engine.HEALTH_MINIMUM, battle_engine.HEALTH_MAXIMUM + 1, stop - start) - raceHealth[matchupIndex]
+		heroStrength = rng.integers(battle_engine.STRENGTH_MINIMUM, battle_engine.STRENGTH_MAXIMUM + 1, stop - start) + strengthModifier[matchupIndex]
+		enemyHealth = rng.integers(battle_engine.HEALTH_MINIMUM, battle_engine.HEALTH_MAXIMUM + 1, stop - start)
+		enemyStrength = rng.integers(battle_engine.STRENGTH_MINIMUM, battle_engine.STRENGTH_MAXIMUM + 1, stop - start)
+
+		heroWon, rounds, heroHealth, enemyHealth = simulate_fights(heroHealth, heroStrength, enemyHealth, enemyStrength, rng)
+		add_results(results, matchupIndex, heroWon, rounds, heroHealth)
+
+	return results
+
+def check_results(results, fights, seed):
+	rng = random.Random(seed)
+	worstScore = 0.0
+
+	for result in results:
+		scalarResult = battle_engine.simulate_build(result.race, result.charClass, result.weapon, fights, rng)
+		pooledRate = (result.wins + scalarResult.wins) / (result.fights + scalarResult.fights)
+		standardError = math.sqrt(pooledRate * (1 - pooledRate) * (1 / result.fights + 1 / scalarResult.fights)) or 1.0
+		score = (result.win_rate() - scalarResult.win_rate()) / standardError
+		worstScore = max(worstScore, abs(score))
+
+		print("{} {} {} {}: win % {:.2f} vectorized / {:.2f} scalar (z = {:+.2f}), rounds {:.3f} / {:.3f}, avg HP {:.2f} / {:.2f}".format(result.race, result.charClass, result.weapon, result.enemy, result.win_rate() * 100, scalarResult.win_rate() * 100, score, result.average_rounds(), scalarResult.average_rounds(), result.average_health(), scalarResult.average_health()))
+
+	return worstScore
+
+def main():
+	parser = argparse.ArgumentParser(description="Simulate every matchup of The Battle with vectorized fights.")
+	parser.add_argument("--fights", type=int, default=DEFAULT_FIGHTS, help="fights to simulate for each matchup")
+	parser.add_argument("--seed", type=int, help="seed for the random number generator")
+	parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE, help="fights simulated together in one set of arrays")
+	parser.add_argument("--race", choices=battle_engine.RACE_OPTIONS, help="only simulate heroes of this race")
+	parser.add_argument("--class", dest="charClass", choices=battle_engine.CHAR_CLASS_OPTIONS, help="only simulate heroes of this class")
+	parser.add_argument("--weapon", choices=battle_engine.WEAPON_OPTIONS, help="only simulate heroes with this weapon")
+	parser.add_argument("--enemy", choices=battle_engine.ENEMY_OPTIONS, help="only simulate fights against this enemy")
+	parser.add_argument("--group", choices=battle_simulator.GROUP_OPTIONS, default="build", help="combine the results of matchups sharing a race, class, weapon or enemy")
+	parser.add_argument("--csv", help="file to write the results to as CSV")
+	parser.add_argument("--check", type=int, metavar="FIGHTS", help="compare each matchup against this many fights of the scalar engine")
+	args = parser.parse_args()
+
+	matchups = [matchup for matchup in battle_engine.all_matchups() if args.race in (None, matchup[0]) and args.charClass in (None, matchup[1]) and args.weapon in (None, matchup[2]) and args.enemy in (None, matchup[3])]
+
+	rng = np.random.default_rng(args.seed)
+	startTime = time.perf_counter()
+	results = simulate_matchups(matchups, args.fights, rng, args.batch)
+	elapsed = time.perf_counter() - startTime
+	totalFights = len(matchups) * args.fights
+
+	if args.check:
+		worstScore = check_results(results, args.check, args.seed)
+		print("\nLargest win rate difference: {:.2f} standard errors.\n".format(worstScore))
+
+	groupedResults = battle_simulator.group_results(results, args.group)
+	groupedResults.sort(key=lambda result: result.win_rate(), reverse=True)
+	battle_simulator.print_table(groupedResults)
+	print("\nSimulated {} fights in {:.1f}s ({:.0f} fights/sec).".format(totalFights, elapsed, totalFights / elapsed))
+
+	if args.csv:
+		battle_simulator.write_csv(args.csv, groupedResults)
+
+DEFAULT_FIGHTS = 100000
+DEFAULT_BATCH_SIZE = 1000000
+
+if __name__ == "__main__":
+	main()